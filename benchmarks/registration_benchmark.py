@@ -0,0 +1,71 @@
+"""
+Benchmark: /start registrations per second, one commit per registration (the previous
+handler behaviour) versus the batched write-behind queue in services/write_queue.py.
+
+Usage:
+    python benchmarks/registration_benchmark.py [number_of_users]
+
+Runs against a temporary SQLite file, so the bot database is not touched.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+DB_DIR = tempfile.mkdtemp(prefix="registration_benchmark_")
+os.environ["SQLITE_DB_PATH"] = os.path.join(DB_DIR, "bench.sqlite3")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import ensure_tables, get_db_connection, register_user  # noqa: E402
+from services.write_queue import run_write  # noqa: E402
+
+
+def reset_users():
+    conn = get_db_connection()
+    conn.execute("DELETE FROM users")
+    conn.commit()
+    conn.close()
+
+
+async def register_unbatched(user_id):
+    """
+    Registration as the /start handler used to do it: connect, insert, commit, close.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    register_user(cursor, user_id, f"user{user_id}")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+async def register_batched(user_id):
+    await run_write(register_user, user_id, f"user{user_id}")
+
+
+async def run(register, count):
+    """
+    Register `count` users concurrently, as during a /start burst.
+    Returns:
+        float: Registrations per second.
+    """
+    start = time.perf_counter()
+    await asyncio.gather(*(register(i) for i in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ensure_tables()
+    reset_users()
+    before = asyncio.run(run(register_unbatched, count))
+    reset_users()
+    after = asyncio.run(run(register_batched, count))
+    print(f"Registrations: {count}")
+    print(f"One commit per registration: {before:10.0f} registrations/s")
+    print(f"Batched write-behind queue:  {after:10.0f} registrations/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
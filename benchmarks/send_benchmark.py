@@ -0,0 +1,151 @@
+"""
+Benchmark: sustained sendMessage throughput against a local fake Bot API server, comparing
+a single-connection client, the library's default client and the tuned client from
+services/telegram_client.py.
+
+The fake server speaks plain HTTP/1.1 with keep-alive and waits `--latency` seconds before
+each response to model the round trip to Telegram. Sends run in `--rounds` fan-outs of
+`--messages` messages with `--concurrency` workers (like a broadcast), separated by `--gap`
+idle seconds; a gap longer than the library's 5 second keep-alive shows the cost of
+reconnecting between reminder fan-outs. HTTP/2 is not used here because the fake server
+only speaks HTTP/1.1.
+
+Usage:
+    python benchmarks/send_benchmark.py [--messages 1000] [--concurrency 10] [--latency 0.02]
+                                        [--rounds 3] [--gap 6]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot  # noqa: E402
+from config import BROADCAST_CONCURRENCY  # noqa: E402
+from services.telegram_client import InstrumentedRequest, build_request, get_connection_metrics  # noqa: E402
+
+TOKEN = "123456:BENCHMARK"
+
+
+class FakeBotApiServer:
+    """
+    Minimal Bot API server answering getMe and sendMessage over HTTP/1.1 keep-alive.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._message_id = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _result(self, method, body):
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        self._message_id += 1
+        chat_id = int(body.get("chat_id", 0))
+        return {
+            "message_id": self._message_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"}, "text": body.get("text", ""),
+        }
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                raw = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                method = request_line.split()[1].decode().rsplit("/", 1)[-1]
+                body = json.loads(raw) if raw and "json" in headers.get("content-type", "") else {}
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                payload = json.dumps({"ok": True, "result": self._result(method, body)}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run(request, args):
+    """
+    Send `args.rounds` fan-outs through one client.
+    Returns:
+        tuple: (sends per second while sending, new connections opened by the client)
+    """
+    server = FakeBotApiServer(args.latency)
+    await server.start()
+    bot = Bot(TOKEN, base_url=f"http://127.0.0.1:{server.port}/bot", request=request)
+    sending_seconds = 0.0
+    async with bot:
+        for round_number in range(args.rounds):
+            if round_number:
+                await asyncio.sleep(args.gap)
+            queue = asyncio.Queue()
+            for i in range(args.messages):
+                queue.put_nowait(1000000 + i)
+
+            async def worker():
+                while not queue.empty():
+                    chat_id = queue.get_nowait()
+                    await bot.send_message(chat_id=chat_id, text=f"Reminder for {chat_id}")
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            sending_seconds += time.perf_counter() - start
+    await server.stop()
+    return args.rounds * args.messages / sending_seconds, get_connection_metrics()[request.pool]["new_connections"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark Telegram sends against a local fake Bot API server")
+    parser.add_argument("--messages", type=int, default=1000, help="Messages per fan-out round (default: 1000)")
+    parser.add_argument("--concurrency", type=int, default=BROADCAST_CONCURRENCY, help="Concurrent senders")
+    parser.add_argument("--latency", type=float, default=0.02, help="Server response delay in seconds (default: 0.02)")
+    parser.add_argument("--rounds", type=int, default=3, help="Number of fan-out rounds (default: 3)")
+    parser.add_argument("--gap", type=float, default=6, help="Idle seconds between rounds (default: 6)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    clients = [
+        ("single connection", lambda: InstrumentedRequest("single connection", connection_pool_size=1, pool_timeout=None)),
+        ("library defaults", lambda: InstrumentedRequest("library defaults")),
+        ("tuned", lambda: build_request("send", http2=False)),
+    ]
+    print(
+        f"{args.rounds} rounds x {args.messages} messages, concurrency {args.concurrency}, "
+        f"server latency {args.latency * 1000:.0f}ms, {args.gap:g}s idle between rounds"
+    )
+    for name, make_request in clients:
+        rate, connections = asyncio.run(run(make_request(), args))
+        print(f"{name:18} {rate:8.0f} sends/s, {connections:4d} new connections")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,3 +11,49 @@ TIMEZONE = os.getenv("TIMEZONE", "Asia/Singapore")
 SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "bot_database.sqlite3")
 CHECK_SHEET_INTERVAL = int(os.getenv("CHECK_SHEET_INTERVAL", 86400))  # Default: 86400 seconds = 1 day
 DEVELOPER_TELEGRAM_ID = os.getenv("DEVELOPER_TELEGRAM_ID", "")
+STATIC_COMMANDS_PATH = os.getenv("STATIC_COMMANDS_PATH", "materials/static_commands.json")
+STATIC_COMMANDS_RELOAD_INTERVAL = int(os.getenv("STATIC_COMMANDS_RELOAD_INTERVAL", 30))  # Seconds between checks for edits
+# Per-user rate limits: a bucket of RATE_LIMIT_BURST commands refilled at RATE_LIMIT_PER_MINUTE
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 5))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", 10))
+# Commands that hit Google or upload files get a smaller per-command bucket and a global concurrency cap
+EXPENSIVE_COMMANDS = [c.strip() for c in os.getenv("EXPENSIVE_COMMANDS", "recent,direction_ntu,direction_e2i,direction_lli").split(",") if c.strip()]
+EXPENSIVE_COMMAND_BURST = int(os.getenv("EXPENSIVE_COMMAND_BURST", 2))
+EXPENSIVE_COMMAND_PER_MINUTE = float(os.getenv("EXPENSIVE_COMMAND_PER_MINUTE", 2))
+EXPENSIVE_COMMAND_CONCURRENCY = int(os.getenv("EXPENSIVE_COMMAND_CONCURRENCY", 4))
+# Updates processed at the same time; must exceed EXPENSIVE_COMMAND_CONCURRENCY for that cap to matter
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", 32))
+# Comma-separated numeric Telegram user IDs allowed to use admin commands such as /broadcast
+ADMIN_TELEGRAM_IDS = {int(i) for i in os.getenv("ADMIN_TELEGRAM_IDS", "").split(",") if i.strip().isdigit()}
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 10))
+BROADCAST_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", 25))  # Telegram allows ~30 messages/second
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", 3))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 5 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+# Set to e.g. "midnight" to rotate by time instead of size
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+# Profiling of scheduler jobs and handlers (also toggled at runtime with /profiling)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.1))  # Fraction of calls run under cProfile
+PROFILE_SLOW_THRESHOLD = float(os.getenv("PROFILE_SLOW_THRESHOLD", 1.0))  # Seconds
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", 20))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Telegram Bot API HTTP client: separate connection pools for outgoing sends and for getUpdates
+TELEGRAM_SEND_POOL_SIZE = int(os.getenv("TELEGRAM_SEND_POOL_SIZE", 32))
+TELEGRAM_UPDATES_POOL_SIZE = int(os.getenv("TELEGRAM_UPDATES_POOL_SIZE", 1))
+TELEGRAM_KEEPALIVE_EXPIRY = float(os.getenv("TELEGRAM_KEEPALIVE_EXPIRY", 120))  # Seconds an idle connection is kept open
+TELEGRAM_HTTP2 = os.getenv("TELEGRAM_HTTP2", "1") == "1"  # Needs python-telegram-bot[http2]; falls back to HTTP/1.1
+# Timeouts in seconds per operation
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", 5))
+TELEGRAM_SEND_READ_TIMEOUT = float(os.getenv("TELEGRAM_SEND_READ_TIMEOUT", 10))
+TELEGRAM_SEND_WRITE_TIMEOUT = float(os.getenv("TELEGRAM_SEND_WRITE_TIMEOUT", 10))
+TELEGRAM_MEDIA_WRITE_TIMEOUT = float(os.getenv("TELEGRAM_MEDIA_WRITE_TIMEOUT", 60))  # File uploads
+TELEGRAM_POOL_TIMEOUT = float(os.getenv("TELEGRAM_POOL_TIMEOUT", 10))  # Waiting for a free connection during fan-out
+TELEGRAM_UPDATES_READ_TIMEOUT = float(os.getenv("TELEGRAM_UPDATES_READ_TIMEOUT", 10))  # Added to the long-poll timeout
+# Attendance window around each activity (SSG QR codes are valid from 30 minutes before start to 30 minutes after end)
+ATTENDANCE_OPENS_BEFORE_MINUTES = int(os.getenv("ATTENDANCE_OPENS_BEFORE_MINUTES", 30))
+ATTENDANCE_CLOSES_AFTER_MINUTES = int(os.getenv("ATTENDANCE_CLOSES_AFTER_MINUTES", 30))
+# Deadline nudges to users who have not confirmed attendance, in minutes before the window closes
+ATTENDANCE_NUDGE_MINUTES = [int(m) for m in os.getenv("ATTENDANCE_NUDGE_MINUTES", "20,5").split(",") if m.strip()]
@@ -0,0 +1,25 @@
+# delivery_report.py
+"""
+Prints reminder delivery lateness percentiles per activity from the 'delivery_log' table.
+
+Usage:
+    python delivery_report.py [--days N]
+"""
+import argparse
+import time
+from services.delivery_log import get_lateness_report, format_lateness_report
+
+
+def main():
+    """
+    Parse command line arguments and print the lateness report.
+    """
+    parser = argparse.ArgumentParser(description="Reminder delivery lateness report")
+    parser.add_argument("--days", type=float, default=None, help="Only include reminders scheduled in the last N days")
+    args = parser.parse_args()
+    since_ts = time.time() - args.days * 86400 if args.days else None
+    print(format_lateness_report(get_lateness_report(since_ts=since_ts)))
+
+
+if __name__ == "__main__":
+    main()
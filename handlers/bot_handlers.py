@@ -1,11 +1,33 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
 from telegram import Update, BotCommand
-from telegram.ext import CommandHandler, ContextTypes
-from services.database import get_db_connection, cleanup_duplicate_telegram_ids
-from config import GOOGLE_SHEET_ID, DEVELOPER_TELEGRAM_ID
+from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
+from services.database import get_state, set_state, register_user, toggle_user_active
+from services.write_queue import run_write
+from services.delivery_log import get_lateness_report, format_lateness_report
+from services.broadcast_service import (
+    create_broadcast, start_broadcast_task, cancel_broadcast, get_broadcast, get_latest_broadcast_id,
+)
+from services.preference_service import (
+    get_preferences, set_preferences, parse_quiet_hours, REMINDER_TYPES, ALLOWED_LEAD_MINUTES,
+)
+from services.reminder_logic import schedule_all_reminders
+from services.telegram_client import get_connection_metrics, format_connection_metrics
+from handlers.rate_limit import get_rate_limit_metrics, format_rate_limit_metrics
+from services.attendance_service import confirm_attendance, CALLBACK_PREFIX
+from utils.auth import is_admin
+from utils.message_templates import ATTENDANCE_CONFIRMED_TEXT
+from utils.profiling import (
+    set_profiling, is_profiling_enabled, get_slow_calls, dump_slow_traces, stats as profiling_stats,
+)
 from datetime import datetime
 import pytz
-from services.sheet_service import fetch_activities, clean_activities_data
+from services.sheet_service import get_activities, on_sheet_change
 from telegram import LinkPreviewOptions
+from handlers.static_commands import get_static_handler, get_static_bot_commands
 
 # /start command
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -17,67 +39,195 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Welcome to the DS2 Reminder Bot!\n"
             "You will receive reminders and materials automatically.\n"
             "The bot checks the Google Sheet daily and sends 2 reminders per activity (30 mins before the start & end).\n"
+            "You can choose other reminders or quiet hours with /reminder_settings.\n"
             "You may retrieve some useful materials related to our course using the commands.\n"
             "It will be nice to mute this bot in order not to affect the lesson.\n"
             "If you wish to stop or resume reminders, use /toggle_reminder."
         )
     # Ensure user is active by default
-    conn = get_db_connection()
-    cursor = conn.cursor()
     user_id = update.effective_user.id if update.effective_user else None
     username = update.effective_user.username if update.effective_user else None
-    cursor.execute(
-        "INSERT OR REPLACE INTO users (telegram_id, username, registration_date, is_active) VALUES (?, ?, datetime('now'), 1)",
-        (user_id, username)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    await run_write(register_user, user_id, username)
 
 async def toggle_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handles the /toggle_reminder command. Enables or disables reminders for the user.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
     user_id = update.effective_user.id if update.effective_user else None
     username = update.effective_user.username if update.effective_user else None
-    cursor.execute("SELECT is_active FROM users WHERE telegram_id=?", (user_id,))
-    row = cursor.fetchone()
-    if row is None:
-        cursor.execute(
-            "INSERT INTO users (telegram_id, username, registration_date, is_active) VALUES (?, ?, datetime('now'), 0)",
-            (user_id, username)
-        )
-        conn.commit()
-        if update.message:
+    new_status, was_registered = await run_write(toggle_user_active, user_id, username)
+    if update.message:
+        if not was_registered:
             await update.message.reply_text("Reminders are now disabled. Use /toggle_reminder to enable them again.")
-    else:
-        new_status = 0 if row[0] else 1
-        cursor.execute("UPDATE users SET is_active=? WHERE telegram_id=?", (new_status, user_id))
-        conn.commit()
-        if update.message:
-            if new_status:
-                await update.message.reply_text("Reminders are now enabled. You will receive notifications.")
-            else:
-                await update.message.reply_text("Reminders are now disabled. You will not receive notifications.")
-    cursor.close()
-    conn.close()
+        elif new_status:
+            await update.message.reply_text("Reminders are now enabled. You will receive notifications.")
+        else:
+            await update.message.reply_text("Reminders are now disabled. You will not receive notifications.")
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Seconds to wait before rescheduling after a settings change, so bursts of changes coalesce
+RESCHEDULE_DELAY = 5
+
+# Rendered /recent reply for the current minute, shared by all users.
+# Cleared whenever the sheet data changes (see on_sheet_change below).
+_recent_cache = {"key": None, "message": None}
+
+def _invalidate_recent_cache():
+    _recent_cache["key"] = None
+    _recent_cache["message"] = None
+
+on_sheet_change(_invalidate_recent_cache)
 
-# /req_schedule command
-async def req_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def render_recent(activities, now):
     """
-    Handles the /req_schedule command. Sends the Google Sheet schedule link to the user.
+    Build the /recent reply text for the next 5 activities starting after `now`.
+    Args:
+        activities (list): Cleaned activity dicts.
+        now (datetime): Current timezone-aware time.
+    Returns:
+        str or None: Message text, or None if there are no upcoming activities.
     """
-    if update.message:
-        sheet_url = f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}/edit"
-        await update.message.reply_text(
-            f"📅 DS2 Schedule\n\n"
-            f"Here's the link to our Google Sheet schedule:\n"
-            f"{sheet_url}\n\n"
-            f"This contains all upcoming activities, timings, and details for our Data Science & AI course."
-        )
+    upcoming_activities = []
+    for activity in activities:
+        start_str = activity.get("StartTime")
+        if start_str:
+            try:
+                start_dt = pytz.timezone('Asia/Singapore').localize(
+                    datetime.strptime(start_str, "%d/%m/%Y %H:%M:%S")
+                )
+                if start_dt > now:
+                    upcoming_activities.append((start_dt, activity))
+            except Exception:
+                continue
 
+    # Sort by start time and take first 5
+    upcoming_activities.sort(key=lambda x: x[0])
+    upcoming_activities = upcoming_activities[:5]
+    if not upcoming_activities:
+        return None
+
+    # Use full Unicode emoji instead of surrogate pairs for compatibility
+    pin_emoji = "\U0001F4CD"  # 📍
+    calendar_emoji = "\U0001F4C5"  # 📅
+    message = f"{pin_emoji} Next 5 Upcoming Activities:\n\n"
+    for i, (start_dt, activity) in enumerate(upcoming_activities, 1):
+        title = activity.get("Title", "Activity")
+        location = activity.get("Location", "TBD")
+        day_of_week = start_dt.strftime("%A")
+        start_time = start_dt.strftime("%d/%m/%Y %H:%M")
+        end_str = activity.get("EndTime", "")
+        github_url = activity.get("GitHub URL")
+        message += f"{i}. {title}\n"
+        message += f"   {calendar_emoji} {day_of_week}, {start_time}"
+        if end_str:
+            try:
+                end_dt = pytz.timezone('Asia/Singapore').localize(
+                    datetime.strptime(end_str, "%d/%m/%Y %H:%M:%S")
+                )
+                message += f" - {end_dt.strftime('%H:%M')}"
+            except Exception:
+                pass
+        message += f"\n   {pin_emoji} {location}"
+        if github_url:
+            message += f"\n   \U0001F5C3 GitHub: {github_url}"
+        message += "\n\n"
+    return message
+
+async def get_recent_message():
+    """
+    Returns the /recent reply for the current minute. Served from cache when possible;
+    otherwise the sheet is fetched once for all concurrent callers and the result cached.
+    Returns:
+        str or None: Message text, or None if there are no upcoming activities.
+    """
+    now = datetime.now(pytz.timezone('Asia/Singapore'))
+    key = now.strftime("%Y%m%d%H%M")
+    if _recent_cache["key"] == key:
+        return _recent_cache["message"]
+    activities = await get_activities()
+    # Another caller sharing the same fetch may already have rendered this minute
+    if _recent_cache["key"] == key:
+        return _recent_cache["message"]
+    message = render_recent(activities, now)
+    _recent_cache["key"] = key
+    _recent_cache["message"] = message
+    return message
+
+# Set while a reminder reschedule triggered by a settings change is queued or running
+_reschedule_pending = {"value": False}
+
+async def _reschedule_after_settings_change(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Reschedule reminders from the local sheet snapshot so that preference changes apply
+    immediately. Several changes in quick succession share one reschedule.
+    """
+    if _reschedule_pending["value"]:
+        return
+    _reschedule_pending["value"] = True
+    try:
+        await asyncio.sleep(RESCHEDULE_DELAY)
+        await schedule_all_reminders(context.bot, from_snapshot=True)
+    except Exception as e:
+        logging.warning(f"Failed to reschedule reminders after a settings change: {e}")
+    finally:
+        _reschedule_pending["value"] = False
+
+def format_preferences(prefs):
+    """
+    Build the text describing a user's reminder preferences.
+    """
+    types = ", ".join(prefs["reminder_types"]) or "none"
+    quiet = f"{prefs['quiet_start']}-{prefs['quiet_end']}" if prefs["quiet_start"] else "off"
+    return (
+        "⚙️ Reminder Settings\n\n"
+        f"Reminder types: {types}\n"
+        f"Minutes before start for 'before' reminders: {prefs['lead_minutes']}\n"
+        f"Quiet hours: {quiet}\n\n"
+        "Change them with:\n"
+        f"/reminder_settings types {','.join(REMINDER_TYPES)}\n"
+        f"/reminder_settings lead <{'|'.join(str(m) for m in ALLOWED_LEAD_MINUTES)}>\n"
+        "/reminder_settings quiet 22:00-07:00 (or 'off')"
+    )
+
+# /reminder_settings command
+async def reminder_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /reminder_settings command. Shows or changes the user's reminder types,
+    lead time and quiet hours.
+    """
+    if not update.message or not update.effective_user:
+        return
+    user_id = update.effective_user.id
+    args = context.args or []
+    if not args:
+        await update.message.reply_text(format_preferences(get_preferences(user_id)))
+        return
+    setting, value = args[0].lower(), " ".join(args[1:]).strip()
+    try:
+        if setting == "types":
+            types = [t.strip() for t in value.split(",") if t.strip()]
+            unknown = [t for t in types if t not in REMINDER_TYPES]
+            if unknown:
+                raise ValueError(f"Unknown reminder types: {', '.join(unknown)}")
+            prefs = set_preferences(user_id, reminder_types=[t for t in REMINDER_TYPES if t in types])
+        elif setting == "lead":
+            if not value.isdigit() or int(value) not in ALLOWED_LEAD_MINUTES:
+                raise ValueError(f"Lead time must be one of {', '.join(str(m) for m in ALLOWED_LEAD_MINUTES)} minutes")
+            prefs = set_preferences(user_id, lead_minutes=int(value))
+        elif setting == "quiet":
+            if value.lower() == "off":
+                prefs = set_preferences(user_id, quiet_start=None, quiet_end=None)
+            else:
+                quiet_start, quiet_end = parse_quiet_hours(value)
+                prefs = set_preferences(user_id, quiet_start=quiet_start, quiet_end=quiet_end)
+        else:
+            raise ValueError(f"Unknown setting: {setting}")
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{format_preferences(get_preferences(user_id))}")
+        return
+    context.application.create_task(_reschedule_after_settings_change(context))
+    await update.message.reply_text(f"✅ Settings updated.\n\n{format_preferences(prefs)}")
 
 # /recent command
 async def recent(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -86,56 +236,8 @@ async def recent(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     if update.message:
         try:
-            # Fetch and clean activities from Google Sheet
-            raw_activities = fetch_activities()
-            activities = clean_activities_data(raw_activities)
-            
-            # Filter and sort upcoming activities
-            now = datetime.now(pytz.timezone('Asia/Singapore'))
-            upcoming_activities = []
-            
-            for activity in activities:
-                start_str = activity.get("StartTime")
-                if start_str:
-                    try:
-                        start_dt = pytz.timezone('Asia/Singapore').localize(
-                            datetime.strptime(start_str, "%d/%m/%Y %H:%M:%S")
-                        )
-                        if start_dt > now:
-                            upcoming_activities.append((start_dt, activity))
-                    except Exception:
-                        continue
-            
-            # Sort by start time and take first 5
-            upcoming_activities.sort(key=lambda x: x[0])
-            upcoming_activities = upcoming_activities[:5]
-            
-            if upcoming_activities:
-                # Use full Unicode emoji instead of surrogate pairs for compatibility
-                pin_emoji = "\U0001F4CD"  # 📍
-                calendar_emoji = "\U0001F4C5"  # 📅
-                message = f"{pin_emoji} Next 5 Upcoming Activities:\n\n"
-                for i, (start_dt, activity) in enumerate(upcoming_activities, 1):
-                    title = activity.get("Title", "Activity")
-                    location = activity.get("Location", "TBD")
-                    day_of_week = start_dt.strftime("%A")
-                    start_time = start_dt.strftime("%d/%m/%Y %H:%M")
-                    end_str = activity.get("EndTime", "")
-                    github_url = activity.get("GitHub URL")
-                    message += f"{i}. {title}\n"
-                    message += f"   {calendar_emoji} {day_of_week}, {start_time}"
-                    if end_str:
-                        try:
-                            end_dt = pytz.timezone('Asia/Singapore').localize(
-                                datetime.strptime(end_str, "%d/%m/%Y %H:%M:%S")
-                            )
-                            message += f" - {end_dt.strftime('%H:%M')}"
-                        except Exception:
-                            pass
-                    message += f"\n   {pin_emoji} {location}"
-                    if github_url:
-                        message += f"\n   \U0001F5C3 GitHub: {github_url}"
-                    message += "\n\n"
+            message = await get_recent_message()
+            if message:
                 await update.message.reply_text(
                     message,
                     link_preview_options=LinkPreviewOptions(is_disabled=True)
@@ -146,176 +248,210 @@ async def recent(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # /broadcast command (hidden - admin only)
 async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /broadcast command. Sends a broadcast message to all users.
+    Handles the /broadcast command. Starts a background job that sends a broadcast message
+    to all users and keeps a progress message up to date.
     """
     if update.message:
-        # Cleanup duplicates before broadcasting
-        cleanup_duplicate_telegram_ids()
-        user_id = update.effective_user.id if update.effective_user else None
-        
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+
         # Check if message has arguments
         if not context.args:
             await update.message.reply_text("📢 Usage: /broadcast <message>")
             return
-        
+
         # Join all arguments to form the broadcast message
         broadcast_message = " ".join(context.args)
-        
-        # Get all unique users from database (including the broadcaster)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT telegram_id FROM users")
-        all_users = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        
-        if not all_users:
-            await update.message.reply_text("No users found in database.")
+
+        progress = await update.message.reply_text("📤 Preparing broadcast...")
+        broadcast_id, recipient_count = create_broadcast(
+            broadcast_message, update.effective_user.id, progress.chat_id, progress.message_id
+        )
+        if not recipient_count:
+            await progress.edit_text("No users found in database.")
             return
-        
-        # Send broadcast message to all users
-        success_count = 0
-        fail_count = 0
-        
-        for target_user_id in all_users:
-            try:
-                await context.bot.send_message(
-                    chat_id=target_user_id, 
-                    text=f"📢 Broadcast Message:\n\n{broadcast_message}"
-                )
-                success_count += 1
-            except Exception as e:
-                fail_count += 1
-        
-        # Send summary to broadcaster
+        start_broadcast_task(context.bot, broadcast_id)
         await update.message.reply_text(
-            f"📊 Broadcast Summary:\n"
-            f"✅ Successfully sent: {success_count}\n"
-            f"❌ Failed to send: {fail_count}\n"
-            f"📱 Total users: {len(all_users)}"
+            f"Broadcast #{broadcast_id} started for {recipient_count} users.\n"
+            f"Use /broadcast_cancel {broadcast_id} to stop it or /broadcast_resume {broadcast_id} to continue it later."
         )
 
-# /wifi command
-async def wifi(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def _broadcast_id_arg(context, status=None):
     """
-    Handles the /wifi command. Provides instructions for NTU Wireless Network Login.
+    Returns the broadcast ID given as the first command argument, or the latest broadcast
+    (optionally with the given status) if no argument was given.
     """
-    if update.message:
-        await update.message.reply_text(
-            "📶 NTU Wireless Network Login\n\n"
-            "1. If you have an NTU Learn account, you can connect to the NTUSECURE WiFi using your NTU credentials. "
-            "You do not need to request for guest credentials each time you want to login.\n\n"
-            "2. For guest access:\n"
-            "   - SMS the word `register` to 93722830 to get free WiFi access for the day.\n"
-            "   - A username and password will be sent to you via SMS.\n"
-            "   - Select wireless network: NTUGUEST.\n"
-            "   - Open your web browser (IE, Firefox, Safari). You will be directed to the login page.\n"
-            "   - Key in:\n"
-            "     * User Name: Your phone number\n"
-            "     * Password: The password received via SMS\n"
-            "       (Note: Password is case sensitive. Do not share your username and password with others.)\n"
-            "   - Domain: GUEST\n"
-            "   - Click Submit."
-        )
+    if context.args and context.args[0].isdigit():
+        return int(context.args[0])
+    return get_latest_broadcast_id(status)
 
-# /direction_ntu command
-async def direction_ntu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# /broadcast_cancel command (hidden - admin only)
+async def broadcast_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /direction_ntu command. Sends the directions to NTU@one-north Executive Centre.
+    Handles the /broadcast_cancel command. Stops a running broadcast; it can be resumed later.
     """
     if update.message:
-        await update.message.reply_document(
-            document=open("materials/Directions to NTU@one-north Executive Centre.pdf", "rb"),
-            caption="📍 Directions to NTU@one-north Executive Centre"
-        )
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+        broadcast_id = _broadcast_id_arg(context, "running")
+        if broadcast_id is None or not cancel_broadcast(broadcast_id):
+            await update.message.reply_text("No running broadcast found.")
+            return
+        await update.message.reply_text(f"Broadcast #{broadcast_id} cancelled.")
 
-# /direction_e2i command
-async def direction_e2i(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# /broadcast_resume command (hidden - admin only)
+async def broadcast_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /direction_e2i command. Sends the directions to e2i@Jurong East.
+    Handles the /broadcast_resume command. Continues a cancelled broadcast with the users
+    who have not received it yet.
     """
     if update.message:
-        await update.message.reply_document(
-            document=open("materials/Direction to e2i@Jurong East.pdf", "rb"),
-            caption="📍 Directions to e2i@Jurong East"
-        )
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+        broadcast_id = _broadcast_id_arg(context, "cancelled")
+        info = get_broadcast(broadcast_id) if broadcast_id is not None else None
+        if info is None or not info["pending"]:
+            await update.message.reply_text("No broadcast with pending recipients found.")
+            return
+        if not start_broadcast_task(context.bot, broadcast_id):
+            await update.message.reply_text(f"Broadcast #{broadcast_id} is already running.")
+            return
+        await update.message.reply_text(f"Broadcast #{broadcast_id} resumed for {info['pending']} remaining users.")
 
-# /direction_lli command
-async def direction_lli(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# /delivery_report command (hidden - admin only)
+async def delivery_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /direction_lli command. Sends the directions to LLI@Paya Lebar.
+    Handles the /delivery_report command. Shows reminder lateness percentiles per activity
+    for the last N days (default 7).
     """
     if update.message:
-        await update.message.reply_document(
-            document=open("materials/Directions to LLI@Paya Lebar.pdf", "rb"),
-            caption="📍 Directions to LLI@Paya Lebar"
-        )
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+        days = int(context.args[0]) if context.args and context.args[0].isdigit() else 7
+        report = get_lateness_report(since_ts=time.time() - days * 86400)
+        text = f"📈 Delivery report (last {days} days)\n\n{format_lateness_report(report)}"
+        if len(text) > TELEGRAM_MESSAGE_LIMIT:
+            text = text[:TELEGRAM_MESSAGE_LIMIT - 30] + "\n... (use delivery_report.py)"
+        await update.message.reply_text(text)
 
-# /feedback command
-async def feedback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# /profiling command (hidden - admin only)
+async def profiling(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /feedback command. Sends feedback or suggestions to the bot creator.
+    Handles the /profiling command. Turns job and handler profiling on or off, shows its
+    status, or dumps the slowest recorded calls to files.
     """
     if update.message:
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+        action = context.args[0].lower() if context.args else "status"
+        if action in ("on", "off"):
+            set_profiling(action == "on")
+        elif action == "dump":
+            paths = dump_slow_traces()
+            await update.message.reply_text(f"Wrote {len(paths)} files:\n" + "\n".join(paths))
+            return
+        elif action != "status":
+            await update.message.reply_text("Usage: /profiling [on|off|status|dump]")
+            return
+        slow = get_slow_calls()
+        lines = [f"{trace['name']}: {trace['duration']:.3f}s" for trace in slow[:10]]
         await update.message.reply_text(
-            "📩 Feedback\n\n"
-            f"I value your feedback! Please send your suggestions or issues to me ({DEVELOPER_TELEGRAM_ID})"
+            f"🔬 Profiling is {'on' if is_profiling_enabled() else 'off'}\n"
+            f"Calls timed: {profiling_stats['calls']}, profiled: {profiling_stats['profiled']}, slow: {profiling_stats['slow']}\n\n"
+            + ("Slowest calls:\n" + "\n".join(lines) if lines else "No slow calls recorded.")
         )
 
-# /ntu_learn command
-async def ntu_learn(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# /http_stats command (hidden - admin only)
+async def http_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /ntu_learn command. Provides the link to NTU Learn for announcements and assessments.
+    Handles the /http_stats command. Shows requests, latency and connection reuse for the
+    Telegram API connection pools.
     """
     if update.message:
-        await update.message.reply_text(
-            "\U0001F4DA NTU Learn\n\n"
-            "Access announcements and assessments at NTU Learn:\n"
-            "https://ntulearn.ntu.edu.sg/ultra/institution-page"
-        )
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+        await update.message.reply_text(f"🌐 Telegram API connections\n\n{format_connection_metrics(get_connection_metrics())}")
 
-# /zoom command
-async def zoom(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# /rate_limit_stats command (hidden - admin only)
+async def rate_limit_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Handles the /zoom command. Provides the link for the Zoom lesson.
+    Handles the /rate_limit_stats command. Shows request and throttling counters per command.
     """
     if update.message:
-        await update.message.reply_text(
-            "\U0001F4F9 Zoom Lesson Link\n\n"
-            "Join the Zoom lesson here:\n"
-            "https://ntu-sg.zoom.us/meeting/register/xtJa3RhhQuurKMnBXuqEWg"
-        )
+        if not is_admin(update):
+            await update.message.reply_text("⛔ This command is restricted to admins.")
+            return
+        text = f"🚦 Rate limiting\n\n{format_rate_limit_metrics(get_rate_limit_metrics())}"
+        if len(text) > TELEGRAM_MESSAGE_LIMIT:
+            text = text[:TELEGRAM_MESSAGE_LIMIT - 20] + "\n... (truncated)"
+        await update.message.reply_text(text)
+
+# Inline "I've taken attendance" button on attendance reminders
+async def attendance_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the attendance confirmation button. Stores the confirmation so the user gets no
+    further attendance reminders for the activity, and removes the button.
+    """
+    query = update.callback_query
+    window_id = int(query.data[len(CALLBACK_PREFIX):])
+    try:
+        confirmed = await run_write(confirm_attendance, window_id, query.from_user.id)
+    except Exception as e:
+        logging.error(f"Failed to confirm attendance for {query.from_user.id}: {e}")
+        await query.answer("❌ Could not save your confirmation. Please try again.")
+        return
+    if confirmed is None:
+        await query.answer("This activity is no longer tracked.")
+        return
+    await query.answer(ATTENDANCE_CONFIRMED_TEXT)
+    try:
+        await query.edit_message_reply_markup(reply_markup=None)
+    except Exception as e:
+        logging.warning(f"Failed to remove attendance button: {e}")
+
+# (command, callback, menu description). Commands with no description are hidden from the menu.
+# Static-content commands (/wifi, /zoom, directions, ...) live in the registry, see handlers/static_commands.py.
+COMMANDS = [
+    ("start", start, "Start the DS2 Reminder Bot and register for reminders"),
+    ("toggle_reminder", toggle_reminder, "Enable or disable reminder notifications"),
+    ("recent", recent, "Show next 5 upcoming activities"),
+    ("reminder_settings", reminder_settings, "Choose reminder types, lead time and quiet hours"),
+    ("broadcast", broadcast, None),
+    ("broadcast_cancel", broadcast_cancel, None),
+    ("broadcast_resume", broadcast_resume, None),
+    ("delivery_report", delivery_report, None),
+    ("profiling", profiling, None),
+    ("http_stats", http_stats, None),
+    ("rate_limit_stats", rate_limit_stats, None),
+]
 
 async def set_bot_commands(application):
-    commands = [
-        BotCommand("start", "Start the DS2 Reminder Bot and register for reminders"),
-        BotCommand("toggle_reminder", "Enable or disable reminder notifications"),
-        BotCommand("req_schedule", "Request the Google Sheet schedule link"),
-        BotCommand("recent", "Show next 5 upcoming activities"),
-        BotCommand("ntu_learn", "Get the link to NTU Learn for announcements and assessments"),
-        BotCommand("zoom", "Get the Zoom lesson link"),
-        BotCommand("wifi", "Instructions for NTU Wireless Network Login"),
-        BotCommand("direction_ntu", "Get directions to NTU@one-north Executive Centre"),
-        BotCommand("direction_e2i", "Get directions to e2i@Jurong East"),
-        BotCommand("direction_lli", "Get directions to LLI@Paya Lebar"),
-        BotCommand("feedback", "Send feedback or suggestions to the bot creator"),
-        
-    ]
+    """
+    Sets the Telegram command menu from COMMANDS and the static command registry.
+    The API call is skipped if the menu is unchanged since it was last set for this bot.
+    """
+    commands = [BotCommand(name, description) for name, _, description in COMMANDS if description]
+    commands += get_static_bot_commands()
+    signature = hashlib.sha1(
+        json.dumps([(c.command, c.description) for c in commands]).encode("utf-8")
+    ).hexdigest()
+    # Keyed by bot ID (the token prefix) so a token change for a different bot always sets the menu
+    state_key = f"bot_commands_signature:{application.bot.token.split(':')[0]}"
+    if get_state(state_key) == signature:
+        logging.info("Bot commands unchanged; skipping set_my_commands.")
+        return
     await application.bot.set_my_commands(commands)
+    set_state(state_key, signature)
 
 def get_handlers():
-    return [
-        CommandHandler("start", start),
-        CommandHandler("toggle_reminder", toggle_reminder),
-        CommandHandler("req_schedule", req_schedule),
-        CommandHandler("recent", recent),
-        CommandHandler("broadcast", broadcast),
-        CommandHandler("ntu_learn", ntu_learn),
-        CommandHandler("zoom", zoom),
-        CommandHandler("wifi", wifi),
-        CommandHandler("direction_ntu", direction_ntu),
-        CommandHandler("direction_e2i", direction_e2i),
-        CommandHandler("direction_lli", direction_lli),
-        CommandHandler("feedback", feedback),
-        
-    ]
+    handlers = [CommandHandler(name, callback) for name, callback, _ in COMMANDS]
+    handlers.append(CallbackQueryHandler(attendance_confirmation, pattern=rf"^{CALLBACK_PREFIX}\d+$"))
+    # Catch-all for registry commands; must stay last so the handlers above take precedence
+    handlers.append(get_static_handler())
+    return handlers
@@ -0,0 +1,217 @@
+"""
+Rate limiting middleware for bot command handlers.
+
+Every handler from get_handlers() is wrapped so that each command is checked against:
+- a per-user token bucket shared by all commands,
+- a per-user, per-command token bucket (tighter for EXPENSIVE_COMMANDS),
+- a global concurrency cap for EXPENSIVE_COMMANDS.
+
+Rejected commands get a short "slow down" reply, sent at most once per cooldown window
+per user so that the reply itself cannot be used to flood the bot.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from telegram import Update
+from telegram.ext import ContextTypes
+from config import (
+    RATE_LIMIT_BURST, RATE_LIMIT_PER_MINUTE, EXPENSIVE_COMMANDS,
+    EXPENSIVE_COMMAND_BURST, EXPENSIVE_COMMAND_PER_MINUTE, EXPENSIVE_COMMAND_CONCURRENCY,
+)
+from handlers.static_commands import command_name, is_static_command
+
+SLOW_DOWN_MESSAGE = "⏳ You're sending commands too quickly. Please wait a moment and try again."
+BUSY_MESSAGE = "⏳ The bot is busy right now. Please try again in a moment."
+SLOW_DOWN_COOLDOWN = 30  # Seconds between "slow down" replies to the same user
+EXPENSIVE_QUEUE_TIMEOUT = 10  # Seconds to wait for a concurrency slot before giving up
+MAX_BUCKETS = 10000  # Idle buckets are pruned once this many are tracked
+IDLE_BUCKET_SECONDS = 600  # Buckets untouched for this long are considered full and can be dropped
+
+# key -> [tokens, last_refill_monotonic]
+_buckets = {}
+# user_id -> monotonic time until which no further "slow down" reply is sent
+_notified_until = {}
+_expensive_semaphore = None
+# Command names of the wrapped handlers, filled in by apply_rate_limits()
+_known_commands = set()
+
+metrics = Counter()
+
+
+class TokenBucket:
+    """
+    Token bucket parameters. Buckets start full and refill continuously.
+    """
+
+    def __init__(self, capacity, per_minute):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+
+
+USER_BUCKET = TokenBucket(RATE_LIMIT_BURST, RATE_LIMIT_PER_MINUTE)
+COMMAND_BUCKET = TokenBucket(RATE_LIMIT_BURST, RATE_LIMIT_PER_MINUTE)
+EXPENSIVE_BUCKET = TokenBucket(EXPENSIVE_COMMAND_BURST, EXPENSIVE_COMMAND_PER_MINUTE)
+
+
+def _take(key, bucket, now):
+    """
+    Take one token from the bucket stored under `key`.
+    Returns:
+        bool: True if a token was available.
+    """
+    state = _buckets.get(key)
+    if state is None:
+        state = _buckets[key] = [bucket.capacity, now]
+    tokens = min(bucket.capacity, state[0] + (now - state[1]) * bucket.rate)
+    state[1] = now
+    if tokens < 1:
+        state[0] = tokens
+        return False
+    state[0] = tokens - 1
+    return True
+
+
+def _prune(now):
+    """
+    Drop buckets that have been idle long enough to be full again, bounding memory use.
+    """
+    idle = [key for key, (_, last) in _buckets.items() if now - last > IDLE_BUCKET_SECONDS]
+    for key in idle:
+        del _buckets[key]
+    for user_id in [u for u, until in _notified_until.items() if until < now]:
+        del _notified_until[user_id]
+
+
+def allow(user_id, command):
+    """
+    Check and consume rate limit tokens for a user issuing a command.
+    Args:
+        user_id (int): Telegram user ID.
+        command (str): Command name without the leading slash.
+    Returns:
+        bool: True if the command may run.
+    """
+    now = time.monotonic()
+    if len(_buckets) > MAX_BUCKETS:
+        _prune(now)
+    command_bucket = EXPENSIVE_BUCKET if command in EXPENSIVE_COMMANDS else COMMAND_BUCKET
+    # Check the narrower bucket first so a rejected command does not drain the user's overall budget
+    if not _take((user_id, command), command_bucket, now):
+        return False
+    return _take(user_id, USER_BUCKET, now)
+
+
+def _get_semaphore():
+    global _expensive_semaphore
+    if _expensive_semaphore is None:
+        _expensive_semaphore = asyncio.Semaphore(EXPENSIVE_COMMAND_CONCURRENCY)
+    return _expensive_semaphore
+
+
+async def _reply_once(update: Update, text):
+    """
+    Send a throttling reply, at most once per SLOW_DOWN_COOLDOWN per user.
+    """
+    user_id = update.effective_user.id
+    now = time.monotonic()
+    if _notified_until.get(user_id, 0) > now:
+        metrics["replies_suppressed"] += 1
+        return
+    _notified_until[user_id] = now + SLOW_DOWN_COOLDOWN
+    try:
+        await update.message.reply_text(text)
+    except Exception as e:
+        logging.warning(f"Failed to send rate limit reply: {e}")
+
+
+def _command_label(text):
+    """
+    Command name used for bucket and metric keys. Anything that is not a registered
+    command maps to "unknown", so arbitrary /commands cannot grow the keys without bound.
+    """
+    command = command_name(text)
+    if command in _known_commands or is_static_command(command):
+        return command
+    return "unknown"
+
+
+def rate_limited(callback):
+    """
+    Wrap a handler callback with the rate limits described in this module.
+    Args:
+        callback (coroutine function): Original handler callback.
+    Returns:
+        coroutine function: Wrapped callback.
+    """
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not update.effective_user or not update.message or not update.message.text:
+            return await callback(update, context)
+        command = _command_label(update.message.text)
+        metrics["requests"] += 1
+        metrics[f"requests:{command}"] += 1
+        if not allow(update.effective_user.id, command):
+            metrics["rate_limited"] += 1
+            metrics[f"rate_limited:{command}"] += 1
+            await _reply_once(update, SLOW_DOWN_MESSAGE)
+            return
+        if command not in EXPENSIVE_COMMANDS:
+            return await callback(update, context)
+        semaphore = _get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=EXPENSIVE_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics["concurrency_rejected"] += 1
+            await _reply_once(update, BUSY_MESSAGE)
+            return
+        metrics["expensive_in_flight"] += 1
+        try:
+            return await callback(update, context)
+        finally:
+            metrics["expensive_in_flight"] -= 1
+            semaphore.release()
+    return wrapper
+
+
+def apply_rate_limits(handlers):
+    """
+    Wrap the callback of every handler in place with rate_limited().
+    Args:
+        handlers (list): Handlers as returned by get_handlers().
+    Returns:
+        list: The same handlers, for convenience.
+    """
+    for handler in handlers:
+        _known_commands.update(getattr(handler, "commands", ()))
+        handler.callback = rate_limited(handler.callback)
+    return handlers
+
+
+def get_rate_limit_metrics():
+    """
+    Returns:
+        dict: Snapshot of the rate limiting counters.
+    """
+    snapshot = dict(metrics)
+    snapshot["tracked_buckets"] = len(_buckets)
+    return snapshot
+
+
+def format_rate_limit_metrics(snapshot):
+    """
+    Render get_rate_limit_metrics() output as plain text, busiest commands first.
+    """
+    lines = [
+        f"Requests: {snapshot.get('requests', 0)}, rate limited: {snapshot.get('rate_limited', 0)}, "
+        f"rejected (busy): {snapshot.get('concurrency_rejected', 0)}, replies suppressed: {snapshot.get('replies_suppressed', 0)}",
+        f"Expensive commands in flight: {snapshot.get('expensive_in_flight', 0)}, tracked buckets: {snapshot['tracked_buckets']}",
+    ]
+    per_command = sorted(
+        ((key.split(":", 1)[1], count) for key, count in snapshot.items() if key.startswith("requests:")),
+        key=lambda item: -item[1]
+    )
+    if per_command:
+        lines.append("")
+        for command, count in per_command:
+            lines.append(f"/{command}: {count} requests, {snapshot.get(f'rate_limited:{command}', 0)} rate limited")
+    return "\n".join(lines)
@@ -0,0 +1,178 @@
+"""
+Data-driven registry for static-content commands (/wifi, /zoom, directions, ...).
+
+Commands are declared in the JSON file at STATIC_COMMANDS_PATH. Each entry has a
+"command", a "description" for the Telegram menu, and either a "text" reply or a
+"document" (path to a file) with an optional "caption". Text may use the
+placeholders {sheet_url} and {developer_telegram_id}.
+
+The file is read once into pre-built reply payloads. A background job
+(refresh_static_commands, every STATIC_COMMANDS_RELOAD_INTERVAL seconds) re-reads it in a
+worker thread when its modification time changes and updates the Telegram menu, so
+commands can be added or edited without a restart.
+"""
+import asyncio
+import json
+import logging
+import os
+from telegram import Update, BotCommand, LinkPreviewOptions
+from telegram.ext import MessageHandler, ContextTypes, filters
+from config import STATIC_COMMANDS_PATH, GOOGLE_SHEET_ID, DEVELOPER_TELEGRAM_ID
+
+# command name -> pre-built payload dict
+_registry = {}
+_registry_mtime = None
+
+
+def _build_payload(entry):
+    """
+    Build a ready-to-send reply payload from a registry entry.
+    Args:
+        entry (dict): Raw command entry from the JSON file.
+    Returns:
+        dict: Payload with 'kind' set to 'text' or 'document'.
+    """
+    placeholders = {
+        "sheet_url": f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}/edit",
+        "developer_telegram_id": DEVELOPER_TELEGRAM_ID,
+    }
+    if "document" in entry:
+        path = entry["document"]
+        with open(path, "rb") as f:
+            data = f.read()
+        return {
+            "kind": "document",
+            "data": data,
+            "filename": os.path.basename(path),
+            "caption": entry.get("caption", "").format(**placeholders),
+            "file_id": None,  # Filled in after the first upload so the file is not re-sent
+        }
+    return {
+        "kind": "text",
+        "text": entry["text"].format(**placeholders),
+        "link_preview_options": None if entry.get("link_preview", True) else LinkPreviewOptions(is_disabled=True),
+    }
+
+
+def load_static_commands(path=None):
+    """
+    Load the static command registry from disk and rebuild all reply payloads.
+    Entries that fail to build are skipped with a warning.
+    Args:
+        path (str, optional): Path to the JSON file. Defaults to STATIC_COMMANDS_PATH.
+    Returns:
+        dict: The new registry mapping command name to payload.
+    """
+    global _registry, _registry_mtime
+    path = path or STATIC_COMMANDS_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    registry = {}
+    for entry in data.get("commands", []):
+        try:
+            payload = _build_payload(entry)
+        except Exception as e:
+            logging.warning(f"Skipping static command {entry.get('command')}: {e}")
+            continue
+        payload["description"] = entry.get("description", "")
+        registry[entry["command"]] = payload
+    _registry = registry
+    _registry_mtime = os.path.getmtime(path)
+    logging.info(f"Loaded {len(registry)} static commands from {path}")
+    return registry
+
+
+def reload_if_changed():
+    """
+    Reload the registry if the JSON file changed since the last load.
+    Returns:
+        bool: True if the registry was reloaded.
+    """
+    try:
+        mtime = os.path.getmtime(STATIC_COMMANDS_PATH)
+    except OSError as e:
+        logging.warning(f"Cannot stat static commands file {STATIC_COMMANDS_PATH}: {e}")
+        return False
+    if mtime == _registry_mtime:
+        return False
+    try:
+        load_static_commands()
+    except Exception as e:
+        # Keep serving the previous registry if the new file is broken
+        logging.warning(f"Failed to reload static commands: {e}")
+        return False
+    return True
+
+
+async def refresh_static_commands(application):
+    """
+    Scheduler job: reload the registry off the event loop if the file changed, and update
+    the Telegram command menu when it did.
+    Args:
+        application: The Telegram Application instance.
+    """
+    if not await asyncio.to_thread(reload_if_changed):
+        return
+    # Imported here because bot_handlers imports this module
+    from handlers.bot_handlers import set_bot_commands
+    try:
+        await set_bot_commands(application)
+    except Exception as e:
+        logging.warning(f"Failed to update bot commands after static command reload: {e}")
+
+
+def get_static_bot_commands():
+    """
+    Returns:
+        list: BotCommand entries for every registered static command, in file order.
+    """
+    if _registry_mtime is None:
+        load_static_commands()
+    return [BotCommand(name, payload["description"]) for name, payload in _registry.items()]
+
+
+def is_static_command(name):
+    """
+    Returns:
+        bool: True if `name` is a command in the static registry.
+    """
+    return name in _registry
+
+
+def command_name(text):
+    """
+    Extract the bare command name from a message such as '/wifi@DS2Bot arg'.
+    """
+    return text.split()[0][1:].split("@")[0].lower()
+
+
+async def static_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles every command declared in the static registry by replying with its pre-built payload.
+    """
+    if not update.message or not update.message.text:
+        return
+    payload = _registry.get(command_name(update.message.text))
+    if payload is None:
+        return
+    if payload["kind"] == "text":
+        await update.message.reply_text(payload["text"], link_preview_options=payload["link_preview_options"])
+        return
+    if payload["file_id"]:
+        await update.message.reply_document(document=payload["file_id"], caption=payload["caption"])
+        return
+    sent = await update.message.reply_document(
+        document=payload["data"], filename=payload["filename"], caption=payload["caption"]
+    )
+    if sent and sent.document:
+        payload["file_id"] = sent.document.file_id
+
+
+def get_static_handler():
+    """
+    Returns a single handler that serves all registry commands. It must be added after
+    the regular CommandHandlers so that those take precedence.
+    """
+    if _registry_mtime is None:
+        load_static_commands()
+    return MessageHandler(filters.COMMAND, static_command)
@@ -1,63 +1,165 @@
+import time
+PROCESS_START = time.perf_counter()
+
 import logging
 import asyncio
+from contextlib import contextmanager
 from telegram.ext import ApplicationBuilder
-from config import TELEGRAM_BOT_TOKEN, TIMEZONE
+from config import TELEGRAM_BOT_TOKEN, TIMEZONE, CONCURRENT_UPDATES, STATIC_COMMANDS_RELOAD_INTERVAL
 from handlers.bot_handlers import get_handlers, set_bot_commands
+from handlers.rate_limit import apply_rate_limits
+from handlers.static_commands import refresh_static_commands
 from services.database import ensure_tables
-from services.scheduler_service import start_scheduler, schedule_daily_job
+from services.scheduler_service import start_scheduler, schedule_daily_job, schedule_interval_job
 from services.reminder_logic import schedule_all_reminders
+from services.broadcast_service import resume_broadcasts
+from services.sheet_service import load_snapshot
+from services.telegram_client import build_request
 from populate_modules import populate_modules
+from utils.logging_setup import setup_logging
+from utils.profiling import apply_profiling
+
+setup_logging()
+
+# Duration in seconds of each startup phase, filled in by startup_phase()
+STARTUP_TIMINGS = {"imports": time.perf_counter() - PROCESS_START}
+STARTUP_SHEET_RETRIES = 5
+STARTUP_SHEET_RETRY_DELAY = 60  # Seconds, doubled after each failed attempt
+# Strong references to fire-and-forget startup tasks so they are not garbage collected
+_background_tasks = set()
+
+@contextmanager
+def startup_phase(name):
+    """
+    Context manager that records how long a startup phase took in STARTUP_TIMINGS.
+    Args:
+        name (str): Phase name.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = time.perf_counter() - start
+        logging.info(f"Startup phase '{name}' took {STARTUP_TIMINGS[name]:.3f}s")
 
-logging.basicConfig(
-    # level=logging.INFO,
-    level=logging.WARNING,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
-
-async def setup_bot(test_mode=False):
+def run_in_background(coro):
     """
-    Set up the Telegram bot, initialize database tables, populate modules, add handlers, start the scheduler, schedule reminders, and set bot commands.
-    
+    Schedule a coroutine on the event loop without waiting for it.
     Args:
-        test_mode (bool): If True, run in test mode (schedules only one test reminder).
-    
+        coro (coroutine): Coroutine to run.
+    Returns:
+        asyncio.Task: The created task.
+    """
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def initial_reminder_schedule(bot):
+    """
+    Schedule reminders in the background after startup: first from the local sheet snapshot,
+    then from the live sheet, retrying with backoff if Google is unreachable so that a sheet
+    outage does not stop the bot from running.
+    Args:
+        bot (Bot): Telegram Bot instance.
+    """
+    # Warm start: schedule from the local snapshot first so known reminders are in place
+    # without waiting for Google, then refresh from the live sheet below.
+    if load_snapshot() is not None:
+        try:
+            with startup_phase("snapshot_reminder_schedule"):
+                await schedule_all_reminders(bot, from_snapshot=True)
+        except Exception as e:
+            logging.warning(f"Scheduling reminders from snapshot failed: {e}")
+
+    delay = STARTUP_SHEET_RETRY_DELAY
+    for attempt in range(1, STARTUP_SHEET_RETRIES + 1):
+        try:
+            with startup_phase("initial_reminder_schedule"):
+                # Live sheet only: a snapshot fallback here would end the retries while Google is down
+                await schedule_all_reminders(bot, allow_fallback=False)
+            logging.info("Initial reminders scheduled.")
+            return
+        except Exception as e:
+            logging.warning(f"Initial reminder scheduling failed (attempt {attempt}/{STARTUP_SHEET_RETRIES}): {e}")
+            if attempt < STARTUP_SHEET_RETRIES:
+                await asyncio.sleep(delay)
+                delay *= 2
+    logging.error("Giving up on initial reminder scheduling; the daily refresh will try again.")
+
+async def update_bot_commands(application):
+    """
+    Set the Telegram command menu in the background, logging instead of failing on errors.
+    """
+    try:
+        with startup_phase("set_bot_commands"):
+            await set_bot_commands(application)
+    except Exception as e:
+        logging.warning(f"Failed to set bot commands: {e}")
+
+async def setup_bot():
+    """
+    Set up the Telegram bot in stages. Database tables, modules, handlers and the scheduler
+    are set up before returning so that the bot can answer commands as soon as polling starts.
+    Loading the sheet, scheduling reminders and setting the command menu run as background
+    tasks, so a slow or unavailable Google Sheet does not delay or block startup.
+
     Returns:
         application: The Telegram Application instance.
     """
-    ensure_tables()
-    populate_modules()
+    with startup_phase("database"):
+        ensure_tables()
+        populate_modules()
     if not TELEGRAM_BOT_TOKEN:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is not set. Please check your .env file.")
-    
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
-    for handler in get_handlers():
-        application.add_handler(handler)
-    
-    start_scheduler()
-    
-    # Schedule reminders on startup
-    await schedule_all_reminders(application.bot, test_mode=test_mode)
-    logging.info("Bot started and initial reminders scheduled.")
-    
-    # Schedule daily reminder refresh at 23:00
-    async def daily_reminder_refresh():
-        """
-        Async callback to refresh all reminders daily at the scheduled time.
-        """
-        logging.info("=== Running daily reminder refresh at 23:00 ===")
-        await schedule_all_reminders(application.bot, test_mode=test_mode)
-        logging.info("=== Daily reminder refresh completed ===")
-    
-    schedule_daily_job(23, 0, daily_reminder_refresh, timezone_str=TIMEZONE)
-    logging.info(f"Daily reminder refresh scheduled for 23:00 {TIMEZONE} timezone")
+
+    with startup_phase("handlers"):
+        # Separate connection pools so reminder and broadcast fan-out does not compete with polling.
+        # Updates are handled concurrently so one slow command (e.g. /recent or a PDF upload) does
+        # not hold up everyone else; handlers keep shared state consistent on their own (the write
+        # queue for user writes, single-flight sheet fetches, the expensive-command semaphore).
+        application = (
+            ApplicationBuilder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .request(build_request("send"))
+            .get_updates_request(build_request("updates"))
+            .concurrent_updates(CONCURRENT_UPDATES)
+            .build()
+        )
+        for handler in apply_rate_limits(apply_profiling(get_handlers())):
+            application.add_handler(handler)
+
+    with startup_phase("scheduler"):
+        start_scheduler()
+
+        # Schedule daily reminder refresh at 23:00
+        async def daily_reminder_refresh():
+            """
+            Async callback to refresh all reminders daily at the scheduled time.
+            """
+            logging.info("=== Running daily reminder refresh at 23:00 ===")
+            await schedule_all_reminders(application.bot)
+            logging.info("=== Daily reminder refresh completed ===")
+
+        schedule_daily_job(23, 0, daily_reminder_refresh, timezone_str=TIMEZONE)
+        logging.info(f"Daily reminder refresh scheduled for 23:00 {TIMEZONE} timezone")
+
+        # Pick up edits to the static command registry and keep the command menu in sync
+        schedule_interval_job(
+            STATIC_COMMANDS_RELOAD_INTERVAL, refresh_static_commands, "static_commands_reload", args=[application]
+        )
+
+    # Schedule reminders on startup, without blocking the bot on the sheet download
+    run_in_background(initial_reminder_schedule(application.bot))
 
     # Set bot commands for Telegram UI
-    await set_bot_commands(application)
-    
+    run_in_background(update_bot_commands(application))
+
+    # Continue any broadcast that was interrupted by a restart
+    await resume_broadcasts(application.bot)
+
+    phases = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in STARTUP_TIMINGS.items())
+    logging.warning(f"Bot ready in {time.perf_counter() - PROCESS_START:.3f}s ({phases})")
     return application
 
 def main():
@@ -70,10 +172,7 @@ def main():
         asyncio.set_event_loop(loop)
         
         # Setup the bot
-        import sys
-        test_mode = '--test' in sys.argv
-        print(f"Running in {'test' if test_mode else 'normal'} mode.")
-        application = loop.run_until_complete(setup_bot(test_mode=test_mode))
+        application = loop.run_until_complete(setup_bot())
         
         # Start polling (this will run the event loop)
         application.run_polling()
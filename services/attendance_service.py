@@ -0,0 +1,241 @@
+"""
+Attendance windows and deadline nudges.
+
+Activities from the sheet are joined with the 'modules' table by date. Every activity that
+belongs to a module gets an attendance window, from ATTENDANCE_OPENS_BEFORE_MINUTES before
+its start to ATTENDANCE_CLOSES_AFTER_MINUTES after its end (when the SSG QR code is valid).
+Windows are precomputed and stored in 'attendance_windows' so that inline buttons can refer
+to them by a short ID.
+
+Users confirm attendance with an inline button. Confirmations are stored in
+'attendance_confirmations'. Deadline nudges (ATTENDANCE_NUDGE_MINUTES before a window
+closes) go to active users whose reminder types include an attendance follow-up ('end' or
+'30min_after'). Nudges and those follow-up reminders are only sent to users who have not
+confirmed, so the fan-out shrinks as attendance is confirmed.
+"""
+import logging
+from datetime import datetime, timedelta
+import pytz
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import (
+    TIMEZONE, ATTENDANCE_OPENS_BEFORE_MINUTES, ATTENDANCE_CLOSES_AFTER_MINUTES, ATTENDANCE_NUDGE_MINUTES,
+)
+from services.database import get_db_connection
+from services.delivery_log import record_delivery, flush_delivery_log
+from services.preference_service import get_active_user_profiles, in_quiet_hours
+from services.scheduler_service import schedule_reminder
+from utils.message_templates import ATTENDANCE_NUDGE_TEMPLATE, ATTENDANCE_BUTTON_TEXT
+
+CALLBACK_PREFIX = "attend:"
+# Reminder types about taking attendance; confirmed users are skipped for these
+ATTENDANCE_FOLLOW_UP_TYPES = ("end", "30min_after")
+
+
+def _load_modules():
+    """
+    Returns:
+        list: Module dicts with module_name, attendance_url, qr_code_url, start_date and end_date.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT module_name, attendance_url, qr_code_url, start_date, end_date FROM modules")
+    modules = [
+        {"module_name": r[0], "attendance_url": r[1], "qr_code_url": r[2], "start_date": r[3], "end_date": r[4]}
+        for r in cursor.fetchall()
+    ]
+    cursor.close()
+    conn.close()
+    return modules
+
+
+def build_attendance_windows(activities, now):
+    """
+    Join activities with modules by date and compute each activity's attendance window.
+    Args:
+        activities (list): Cleaned activity dicts from the sheet.
+        now (datetime): Current time; windows that have already closed are skipped.
+    Returns:
+        list: Window dicts with activity (label used in the delivery log), title, start_str,
+        end_str, start_dt, opens, closes, module_name, attendance_url and qr_code_url.
+    """
+    tz = pytz.timezone(TIMEZONE)
+    modules = _load_modules()
+    windows = []
+    for row in activities:
+        start_str = row.get("StartTime")
+        end_str = row.get("EndTime")
+        if not (start_str and end_str):
+            continue
+        try:
+            start_dt = tz.localize(datetime.strptime(start_str, "%d/%m/%Y %H:%M:%S"))
+            end_dt = tz.localize(datetime.strptime(end_str, "%d/%m/%Y %H:%M:%S"))
+        except ValueError:
+            continue
+        closes = end_dt + timedelta(minutes=ATTENDANCE_CLOSES_AFTER_MINUTES)
+        if closes < now:
+            continue
+        day = start_dt.strftime("%Y-%m-%d")
+        module = next((m for m in modules if m["start_date"] <= day <= m["end_date"]), None)
+        if module is None:
+            continue
+        title = row.get("Title") or row.get("Lesson Title") or row.get("Unit") or "Activity"
+        windows.append({
+            "activity": f"{title} ({start_str})",
+            "title": title,
+            "start_str": start_str,
+            "end_str": end_str,
+            "start_dt": start_dt,
+            "opens": start_dt - timedelta(minutes=ATTENDANCE_OPENS_BEFORE_MINUTES),
+            "closes": closes,
+            "module_name": module["module_name"],
+            "attendance_url": module["attendance_url"],
+            "qr_code_url": module["qr_code_url"],
+        })
+    return windows
+
+
+def save_attendance_windows(windows):
+    """
+    Store windows in 'attendance_windows', keeping the ID of windows that already exist,
+    and set each window's 'window_id'.
+    Args:
+        windows (list): Output of build_attendance_windows().
+    Returns:
+        dict: Activity label -> window ID.
+    """
+    if not windows:
+        return {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO attendance_windows (activity, module_name, opens_ts, closes_ts) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(activity) DO UPDATE SET module_name=excluded.module_name, "
+        "opens_ts=excluded.opens_ts, closes_ts=excluded.closes_ts",
+        [(w["activity"], w["module_name"], w["opens"].timestamp(), w["closes"].timestamp()) for w in windows]
+    )
+    conn.commit()
+    cursor.execute("SELECT activity, window_id FROM attendance_windows WHERE closes_ts >= ?",
+                   (min(w["closes"] for w in windows).timestamp(),))
+    window_ids = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    for window in windows:
+        window["window_id"] = window_ids[window["activity"]]
+    return {w["activity"]: w["window_id"] for w in windows}
+
+
+def confirm_attendance(cursor, window_id, telegram_id):
+    """
+    Record that a user has taken attendance. Meant to be run through
+    services.write_queue.run_write().
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the write transaction.
+        window_id (int): Attendance window ID from the inline button.
+        telegram_id (int): Telegram user ID.
+    Returns:
+        bool: True if newly confirmed, False if already confirmed, None if the window is unknown.
+    """
+    cursor.execute("SELECT 1 FROM attendance_windows WHERE window_id=?", (window_id,))
+    if cursor.fetchone() is None:
+        return None
+    cursor.execute(
+        "INSERT OR IGNORE INTO attendance_confirmations (window_id, telegram_id, confirmed_at) "
+        "VALUES (?, ?, datetime('now'))",
+        (window_id, telegram_id)
+    )
+    return cursor.rowcount == 1
+
+
+def get_confirmed_users(window_id):
+    """
+    Returns:
+        set: Telegram IDs of users who confirmed attendance for the window.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT telegram_id FROM attendance_confirmations WHERE window_id=?", (window_id,))
+    confirmed = {r[0] for r in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return confirmed
+
+
+def get_unconfirmed_users(window_id, send_time):
+    """
+    Active users who want attendance follow-ups (their reminder types include one of
+    ATTENDANCE_FOLLOW_UP_TYPES), have not confirmed attendance for the window and are not
+    in quiet hours at send_time.
+    Returns:
+        list: Telegram IDs.
+    """
+    confirmed = get_confirmed_users(window_id)
+    return [
+        user_id
+        for (types, _, quiet_start, quiet_end), profile_users in get_active_user_profiles().items()
+        if any(t in ATTENDANCE_FOLLOW_UP_TYPES for t in types)
+        and not in_quiet_hours(quiet_start, quiet_end, send_time)
+        for user_id in profile_users
+        if user_id not in confirmed
+    ]
+
+
+def attendance_keyboard(window_id):
+    """
+    Returns:
+        InlineKeyboardMarkup: A single button that confirms attendance for the window.
+    """
+    return InlineKeyboardMarkup([[InlineKeyboardButton(ATTENDANCE_BUTTON_TEXT, callback_data=f"{CALLBACK_PREFIX}{window_id}")]])
+
+
+async def send_attendance_nudge(bot, window, minutes, nudge_time):
+    """
+    Scheduler callback: remind users who have not confirmed attendance that the window closes soon.
+    Args:
+        bot (Bot): Telegram Bot instance.
+        window (dict): Attendance window with a window_id.
+        minutes (int): Minutes until the window closes.
+        nudge_time (datetime): Scheduled send time, for the delivery log.
+    """
+    recipients = get_unconfirmed_users(window["window_id"], nudge_time)
+    logging.info(f"Sending attendance nudge: title={window['title']}, minutes={minutes}, recipients={len(recipients)}")
+    msg = ATTENDANCE_NUDGE_TEMPLATE.format(title=window["title"], minutes=minutes, close_time=window["closes"].strftime("%H:%M"))
+    msg += f"\n\nModule: {window['module_name']}"
+    msg += f"\nAttendance URL: {window['attendance_url']}"
+    msg += f"\nQR Code URL: {window['qr_code_url']}"
+    keyboard = attendance_keyboard(window["window_id"])
+    for user_id in recipients:
+        try:
+            sent = await bot.send_message(chat_id=user_id, text=msg, reply_markup=keyboard)
+            record_delivery(window["activity"], "attendance_nudge", user_id, nudge_time, message_id=sent.message_id)
+        except Exception as e:
+            record_delivery(window["activity"], "attendance_nudge", user_id, nudge_time, outcome="failed", error=str(e))
+            logging.warning(f"Failed to send attendance nudge to {user_id}: {e}", extra={"event": "reminder_send_failed", "user_id": user_id})
+    await flush_delivery_log()
+
+
+def schedule_attendance_nudges(bot, windows, now):
+    """
+    Schedule deadline nudges for windows of activities starting within the next day, the
+    same horizon as the other reminders. Recipients are chosen when each nudge is sent,
+    so confirmations made after scheduling are respected.
+    Args:
+        bot (Bot): Telegram Bot instance.
+        windows (list): Saved windows from save_attendance_windows().
+        now (datetime): Current time.
+    Returns:
+        int: Number of nudges scheduled.
+    """
+    count = 0
+    for window in windows:
+        if (window["start_dt"] - now).days > 1:
+            continue
+        for minutes in ATTENDANCE_NUDGE_MINUTES:
+            nudge_time = window["closes"] - timedelta(minutes=minutes)
+            if nudge_time < now or nudge_time < window["opens"]:
+                continue
+            schedule_reminder(
+                nudge_time, send_attendance_nudge, [bot, window, minutes, nudge_time],
+                name=f"nudge:{minutes}min:{window['activity']}"
+            )
+            count += 1
+    return count
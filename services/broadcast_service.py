@@ -0,0 +1,341 @@
+"""
+Background broadcast jobs.
+
+A broadcast is stored in the 'broadcasts' table together with one row per recipient in
+'broadcast_recipients'. Messages are sent concurrently by a small pool of workers, paced
+to BROADCAST_RATE_PER_SECOND, and recipient outcomes are checkpointed to SQLite every
+BROADCAST_PROGRESS_INTERVAL seconds. The admin's progress message is edited on the same
+interval. Broadcasts still marked 'running' after a restart are resumed from the pending
+recipients, so a user is re-sent the message only if the bot stopped before their
+delivery was checkpointed.
+"""
+import asyncio
+import logging
+import time
+from telegram import Bot
+from telegram.error import RetryAfter, Forbidden, BadRequest
+from config import BROADCAST_CONCURRENCY, BROADCAST_RATE_PER_SECOND, BROADCAST_PROGRESS_INTERVAL
+from services.database import get_db_connection, cleanup_duplicate_telegram_ids
+
+BROADCAST_PREFIX = "📢 Broadcast Message:\n\n"
+MAX_SEND_ATTEMPTS = 3
+
+# broadcast_id -> asyncio.Task for broadcasts running in this process
+_running = {}
+
+
+def create_broadcast(message, created_by, progress_chat_id, progress_message_id):
+    """
+    Create a broadcast and its recipient list (all unique users) in the database.
+    Args:
+        message (str): Broadcast text.
+        created_by (int): Telegram ID of the admin who started it.
+        progress_chat_id (int): Chat holding the progress message.
+        progress_message_id (int): Message to edit with progress updates.
+    Returns:
+        tuple: (broadcast_id, recipient_count). If there are no users, nothing is stored
+        and broadcast_id is None.
+    """
+    cleanup_duplicate_telegram_ids()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO broadcasts (message, created_by, created_at, status, progress_chat_id, progress_message_id) "
+        "VALUES (?, ?, datetime('now'), 'running', ?, ?)",
+        (message, created_by, progress_chat_id, progress_message_id)
+    )
+    broadcast_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT OR IGNORE INTO broadcast_recipients (broadcast_id, telegram_id) "
+        "SELECT DISTINCT ?, telegram_id FROM users WHERE telegram_id IS NOT NULL",
+        (broadcast_id,)
+    )
+    recipient_count = cursor.rowcount
+    if recipient_count:
+        conn.commit()
+    else:
+        # Don't leave an empty 'running' broadcast for resume_broadcasts() to pick up
+        conn.rollback()
+        broadcast_id = None
+    cursor.close()
+    conn.close()
+    return broadcast_id, recipient_count
+
+
+def get_broadcast(broadcast_id):
+    """
+    Args:
+        broadcast_id (int): Broadcast ID.
+    Returns:
+        dict or None: Broadcast row with recipient counts by status.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT message, status, progress_chat_id, progress_message_id FROM broadcasts WHERE broadcast_id=?",
+        (broadcast_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        cursor.close()
+        conn.close()
+        return None
+    cursor.execute(
+        "SELECT status, COUNT(*) FROM broadcast_recipients WHERE broadcast_id=? GROUP BY status",
+        (broadcast_id,)
+    )
+    counts = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return {
+        "broadcast_id": broadcast_id,
+        "message": row[0],
+        "status": row[1],
+        "progress_chat_id": row[2],
+        "progress_message_id": row[3],
+        "sent": counts.get("sent", 0),
+        "failed": counts.get("failed", 0),
+        "pending": counts.get("pending", 0),
+    }
+
+
+def get_latest_broadcast_id(status=None):
+    """
+    Args:
+        status (str, optional): Only consider broadcasts with this status.
+    Returns:
+        int or None: The most recent broadcast ID.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if status:
+        cursor.execute("SELECT MAX(broadcast_id) FROM broadcasts WHERE status=?", (status,))
+    else:
+        cursor.execute("SELECT MAX(broadcast_id) FROM broadcasts")
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row[0] if row else None
+
+
+def _set_status(broadcast_id, status):
+    conn = get_db_connection()
+    conn.execute("UPDATE broadcasts SET status=? WHERE broadcast_id=?", (status, broadcast_id))
+    conn.commit()
+    conn.close()
+
+
+def _get_pending_recipients(broadcast_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT telegram_id FROM broadcast_recipients WHERE broadcast_id=? AND status='pending'",
+        (broadcast_id,)
+    )
+    recipients = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return recipients
+
+
+def _checkpoint(broadcast_id, results):
+    """
+    Persist recipient outcomes in a single transaction.
+    Args:
+        broadcast_id (int): Broadcast ID.
+        results (list): (telegram_id, status, error) tuples.
+    """
+    if not results:
+        return
+    conn = get_db_connection()
+    conn.executemany(
+        "UPDATE broadcast_recipients SET status=?, error=? WHERE broadcast_id=? AND telegram_id=?",
+        [(status, error, broadcast_id, telegram_id) for telegram_id, status, error in results]
+    )
+    conn.commit()
+    conn.close()
+
+
+def format_progress(info, final=False):
+    """
+    Build the text of the admin's progress message.
+    Args:
+        info (dict): Broadcast info as returned by get_broadcast().
+        final (bool): Whether the broadcast has finished.
+    Returns:
+        str: Progress text.
+    """
+    total = info["sent"] + info["failed"] + info["pending"]
+    header = "📊 Broadcast Summary" if final else "📤 Broadcast in progress"
+    return (
+        f"{header} (#{info['broadcast_id']}, {info['status']}):\n"
+        f"✅ Successfully sent: {info['sent']}\n"
+        f"❌ Failed to send: {info['failed']}\n"
+        f"⏳ Pending: {info['pending']}\n"
+        f"📱 Total users: {total}"
+    )
+
+
+async def _wait_for_slot(next_slot, interval):
+    """
+    Reserve the next send slot shared by all workers and sleep until it, so that all
+    workers together respect the rate limit and pause together after flood control.
+    Args:
+        next_slot (list): [monotonic time of the next free slot, monotonic time until which
+            flood control pauses sending].
+        interval (float): Seconds between sends.
+    """
+    while True:
+        now = time.monotonic()
+        slot = max(now, next_slot[0])
+        next_slot[0] = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        if time.monotonic() >= next_slot[1]:
+            return
+        # A RetryAfter arrived while waiting: take a new slot after the pause instead
+        # of sending at once together with every other waiting worker
+
+
+async def _send_with_retry(bot: Bot, chat_id, text, next_slot, interval):
+    """
+    Send a message, honouring Telegram flood-control RetryAfter responses. A RetryAfter
+    pushes the shared send slot back, pausing every worker of the broadcast.
+    Returns:
+        tuple: (status, error) where status is 'sent' or 'failed'.
+    """
+    for attempt in range(MAX_SEND_ATTEMPTS):
+        if attempt:
+            await _wait_for_slot(next_slot, interval)
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+            return "sent", None
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            resume_at = time.monotonic() + retry_after
+            next_slot[0] = max(next_slot[0], resume_at)
+            next_slot[1] = max(next_slot[1], resume_at)
+        except (Forbidden, BadRequest) as e:
+            # Blocked the bot, deleted account, invalid chat: retrying will not help
+            return "failed", str(e)
+        except Exception as e:
+            return "failed", str(e)
+    return "failed", "Flood control retries exhausted"
+
+
+async def _update_progress(bot: Bot, broadcast_id, final=False):
+    info = get_broadcast(broadcast_id)
+    if not info or not info["progress_chat_id"]:
+        return
+    try:
+        await bot.edit_message_text(
+            chat_id=info["progress_chat_id"],
+            message_id=info["progress_message_id"],
+            text=format_progress(info, final=final)
+        )
+    except BadRequest as e:
+        # "Message is not modified" when nothing changed since the last edit
+        logging.debug(f"Broadcast {broadcast_id} progress edit skipped: {e}")
+    except Exception as e:
+        logging.warning(f"Failed to update broadcast {broadcast_id} progress: {e}")
+
+
+async def run_broadcast(bot: Bot, broadcast_id):
+    """
+    Send a broadcast to all of its pending recipients.
+    Args:
+        bot (Bot): Telegram Bot instance.
+        broadcast_id (int): Broadcast ID.
+    """
+    info = get_broadcast(broadcast_id)
+    if info is None:
+        return
+    text = f"{BROADCAST_PREFIX}{info['message']}"
+    queue = asyncio.Queue()
+    for telegram_id in _get_pending_recipients(broadcast_id):
+        queue.put_nowait(telegram_id)
+    results = []
+    interval = 1.0 / BROADCAST_RATE_PER_SECOND
+    next_slot = [time.monotonic(), 0.0]
+
+    async def worker():
+        while True:
+            try:
+                telegram_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await _wait_for_slot(next_slot, interval)
+            status, error = await _send_with_retry(bot, telegram_id, text, next_slot, interval)
+            results.append((telegram_id, status, error))
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(BROADCAST_PROGRESS_INTERVAL)
+            batch = results[:]
+            del results[:len(batch)]
+            await asyncio.to_thread(_checkpoint, broadcast_id, batch)
+            await _update_progress(bot, broadcast_id)
+
+    workers = [asyncio.create_task(worker()) for _ in range(BROADCAST_CONCURRENCY)]
+    reporter_task = asyncio.create_task(reporter())
+    status = "completed"
+    try:
+        await asyncio.gather(*workers)
+    except asyncio.CancelledError:
+        for task in workers:
+            task.cancel()
+        status = "cancelled"
+    finally:
+        reporter_task.cancel()
+        _checkpoint(broadcast_id, results)
+        _set_status(broadcast_id, status)
+        _running.pop(broadcast_id, None)
+    logging.info(f"Broadcast {broadcast_id} {status}")
+    await _update_progress(bot, broadcast_id, final=True)
+
+
+def start_broadcast_task(bot: Bot, broadcast_id):
+    """
+    Run a broadcast in the background. Does nothing if it is already running.
+    Args:
+        bot (Bot): Telegram Bot instance.
+        broadcast_id (int): Broadcast ID.
+    Returns:
+        bool: True if a new task was started.
+    """
+    if broadcast_id in _running:
+        return False
+    _set_status(broadcast_id, "running")
+    _running[broadcast_id] = asyncio.create_task(run_broadcast(bot, broadcast_id))
+    return True
+
+
+def cancel_broadcast(broadcast_id):
+    """
+    Cancel a broadcast running in this process. Recipients already sent are kept,
+    so the broadcast can be resumed later.
+    Returns:
+        bool: True if a running broadcast was cancelled.
+    """
+    task = _running.get(broadcast_id)
+    if task is None:
+        return False
+    task.cancel()
+    return True
+
+
+async def resume_broadcasts(bot: Bot):
+    """
+    Resume every broadcast left in the 'running' state, e.g. after a restart.
+    Args:
+        bot (Bot): Telegram Bot instance.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT broadcast_id FROM broadcasts WHERE status='running'")
+    broadcast_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    for broadcast_id in broadcast_ids:
+        logging.warning(f"Resuming interrupted broadcast {broadcast_id}")
+        start_broadcast_task(bot, broadcast_id)
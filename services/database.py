@@ -13,7 +13,9 @@ def get_db_connection():
 
 def ensure_tables():
     """
-    Ensures that the required tables ('users' and 'modules') exist in the database.
+    Ensures that the required tables ('users', 'modules', 'broadcasts',
+    'broadcast_recipients', 'user_preferences', 'sheet_snapshot', 'delivery_log',
+    'attendance_windows', 'attendance_confirmations' and 'bot_state') exist in the database.
     Creates them if they do not exist.
     """
     conn = get_db_connection()
@@ -37,11 +39,144 @@ def ensure_tables():
         start_date TEXT,
         end_date TEXT
     )''')
-    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        broadcast_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message TEXT,
+        created_by INTEGER,
+        created_at TEXT,
+        status TEXT,
+        progress_chat_id INTEGER,
+        progress_message_id INTEGER
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS broadcast_recipients (
+        broadcast_id INTEGER,
+        telegram_id INTEGER,
+        status TEXT DEFAULT 'pending',
+        error TEXT,
+        PRIMARY KEY (broadcast_id, telegram_id)
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_preferences (
+        telegram_id INTEGER PRIMARY KEY,
+        reminder_types TEXT,
+        lead_minutes INTEGER,
+        quiet_start TEXT,
+        quiet_end TEXT
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sheet_snapshot (
+        snapshot_id INTEGER PRIMARY KEY CHECK (snapshot_id = 1),
+        format_version INTEGER,
+        fetched_at TEXT,
+        digest TEXT,
+        activities TEXT
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS delivery_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        activity TEXT,
+        reminder_type TEXT,
+        telegram_id INTEGER,
+        scheduled_ts REAL,
+        sent_ts REAL,
+        message_id INTEGER,
+        outcome TEXT,
+        error TEXT
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_delivery_log_scheduled ON delivery_log (scheduled_ts)')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS attendance_windows (
+        window_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        activity TEXT UNIQUE,
+        module_name TEXT,
+        opens_ts REAL,
+        closes_ts REAL
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS attendance_confirmations (
+        window_id INTEGER,
+        telegram_id INTEGER,
+        confirmed_at TEXT,
+        PRIMARY KEY (window_id, telegram_id)
+    )''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )''')
+
     conn.commit()
     cursor.close()
     conn.close()
 
+def register_user(cursor, telegram_id, username):
+    """
+    Register a user, or re-register them as active. Meant to be run through
+    services.write_queue.run_write() so that registration bursts are batched.
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the write transaction.
+        telegram_id (int): Telegram user ID.
+        username (str): Telegram username.
+    """
+    cursor.execute(
+        "INSERT OR REPLACE INTO users (telegram_id, username, registration_date, is_active) VALUES (?, ?, datetime('now'), 1)",
+        (telegram_id, username)
+    )
+
+def toggle_user_active(cursor, telegram_id, username):
+    """
+    Flip a user's reminder status. Unknown users are registered with reminders disabled.
+    Meant to be run through services.write_queue.run_write().
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the write transaction.
+        telegram_id (int): Telegram user ID.
+        username (str): Telegram username.
+    Returns:
+        tuple: (new_status, was_registered) where new_status is 1 or 0.
+    """
+    cursor.execute("SELECT is_active FROM users WHERE telegram_id=?", (telegram_id,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            "INSERT INTO users (telegram_id, username, registration_date, is_active) VALUES (?, ?, datetime('now'), 0)",
+            (telegram_id, username)
+        )
+        return 0, False
+    new_status = 0 if row[0] else 1
+    cursor.execute("UPDATE users SET is_active=? WHERE telegram_id=?", (new_status, telegram_id))
+    return new_status, True
+
+def get_state(key, default=None):
+    """
+    Read a value from the 'bot_state' key/value table.
+    Args:
+        key (str): State key.
+        default: Value returned if the key is not set.
+    Returns:
+        str: Stored value, or default.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM bot_state WHERE key=?", (key,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row[0] if row else default
+
+def set_state(key, value):
+    """
+    Store a value in the 'bot_state' key/value table.
+    Args:
+        key (str): State key.
+        value (str): Value to store.
+    """
+    conn = get_db_connection()
+    conn.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)", (key, value))
+    conn.commit()
+    conn.close()
+
 def cleanup_duplicate_telegram_ids():
     """
     Removes duplicate Telegram user IDs from the 'users' table, keeping only the latest entry for each Telegram ID.
@@ -0,0 +1,122 @@
+"""
+Append-only delivery log for reminders.
+
+Each reminder send records the activity, reminder type, recipient, scheduled time, actual
+send time, Telegram message ID and outcome. Records are buffered in memory while a
+reminder fans out and written to the 'delivery_log' table in one batched transaction,
+so logging adds almost nothing to the send loop.
+"""
+import logging
+import math
+from services.database import get_db_connection
+from services.write_queue import run_write
+from utils import clock
+
+# Pending (activity, reminder_type, telegram_id, scheduled_ts, sent_ts, message_id, outcome, error) rows
+_buffer = []
+
+
+def record_delivery(activity, reminder_type, telegram_id, scheduled_at, message_id=None, outcome="sent", error=None):
+    """
+    Buffer one delivery record. Call flush_delivery_log() to persist buffered records.
+    Args:
+        activity (str): Activity label, e.g. "Title (01/07/2025 19:00:00)".
+        reminder_type (str): Reminder type, e.g. 'before' or 'end'.
+        telegram_id (int): Recipient.
+        scheduled_at (datetime): When the reminder was scheduled to be sent.
+        message_id (int, optional): Telegram message ID if the send succeeded.
+        outcome (str): 'sent' or 'failed'.
+        error (str, optional): Error text for failed sends.
+    """
+    _buffer.append((
+        activity, reminder_type, telegram_id, scheduled_at.timestamp(), clock.timestamp(), message_id, outcome, error
+    ))
+
+
+def _insert_records(cursor, records):
+    cursor.executemany(
+        "INSERT INTO delivery_log (activity, reminder_type, telegram_id, scheduled_ts, sent_ts, message_id, outcome, error) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        records
+    )
+
+
+async def flush_delivery_log():
+    """
+    Write all buffered delivery records to the database in a single transaction.
+    """
+    if not _buffer:
+        return
+    records = _buffer[:]
+    del _buffer[:len(records)]
+    try:
+        await run_write(_insert_records, records)
+    except Exception as e:
+        logging.error(f"Failed to write {len(records)} delivery log records: {e}")
+
+
+def _percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def get_lateness_report(since_ts=None):
+    """
+    Compute lateness percentiles per activity and reminder type.
+    Args:
+        since_ts (float, optional): Only include reminders scheduled at or after this Unix time.
+    Returns:
+        list: Dicts with activity, reminder_type, sent, failed, p50, p90, p99 and max
+        (lateness in seconds of successful sends), ordered by scheduled time.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT activity, reminder_type, scheduled_ts, outcome, sent_ts - scheduled_ts FROM delivery_log "
+        "WHERE scheduled_ts >= ? ORDER BY scheduled_ts",
+        (since_ts or 0,)
+    )
+    groups = {}
+    for activity, reminder_type, scheduled_ts, outcome, lateness in cursor.fetchall():
+        group = groups.setdefault((activity, reminder_type), {"lateness": [], "failed": 0})
+        if outcome == "sent":
+            group["lateness"].append(lateness)
+        else:
+            group["failed"] += 1
+    cursor.close()
+    conn.close()
+    report = []
+    for (activity, reminder_type), group in groups.items():
+        lateness = sorted(group["lateness"])
+        row = {"activity": activity, "reminder_type": reminder_type, "sent": len(lateness), "failed": group["failed"]}
+        for name, pct in (("p50", 50), ("p90", 90), ("p99", 99)):
+            row[name] = _percentile(lateness, pct) if lateness else None
+        row["max"] = lateness[-1] if lateness else None
+        report.append(row)
+    return report
+
+
+def format_lateness_report(report):
+    """
+    Render a lateness report as plain text.
+    Args:
+        report (list): Output of get_lateness_report().
+    Returns:
+        str: One block per activity and reminder type.
+    """
+    if not report:
+        return "No deliveries recorded."
+    lines = []
+    for row in report:
+        lines.append(f"{row['activity']} [{row['reminder_type']}]")
+        if row["sent"]:
+            lines.append(
+                f"  sent {row['sent']}, failed {row['failed']} | lateness p50 {row['p50']:.2f}s, "
+                f"p90 {row['p90']:.2f}s, p99 {row['p99']:.2f}s, max {row['max']:.2f}s"
+            )
+        else:
+            lines.append(f"  sent 0, failed {row['failed']}")
+    return "\n".join(lines)
@@ -0,0 +1,170 @@
+"""
+Per-user reminder preferences: which reminder types a user receives, how many minutes
+before an activity the "before" reminder is sent, and quiet hours during which no
+reminders are sent.
+
+Users with identical settings share a preference profile. The scheduler creates one job
+per (activity, reminder type, send time) and fans out to every profile that needs it, so
+the number of jobs depends on the small set of allowed settings, not on the number of users.
+"""
+from datetime import datetime, timedelta
+from services.database import get_db_connection
+
+# Reminder types, in the order they occur around an activity
+REMINDER_TYPES = ["before", "start", "mid", "end", "30min_after"]
+DEFAULT_REMINDER_TYPES = ("before", "end")
+DEFAULT_LEAD_MINUTES = 30
+# Lead times are limited to a fixed set so that jobs per activity stay bounded
+ALLOWED_LEAD_MINUTES = [5, 10, 15, 30, 45, 60]
+
+DEFAULT_PROFILE = (DEFAULT_REMINDER_TYPES, DEFAULT_LEAD_MINUTES, None, None)
+QUIET_HOURS_FORMAT_ERROR = "Quiet hours must look like 22:00-07:00"
+
+
+def _parse_types(value):
+    """
+    Parse a stored comma-separated list of reminder types, in canonical order.
+    """
+    return tuple(t for t in REMINDER_TYPES if t in value.split(","))
+
+
+def _profile_from_row(reminder_types, lead_minutes, quiet_start, quiet_end):
+    """
+    Build a hashable preference profile (types, lead_minutes, quiet_start, quiet_end) from a
+    'user_preferences' row, filling in defaults for missing values.
+    """
+    return (
+        _parse_types(reminder_types) if reminder_types is not None else DEFAULT_REMINDER_TYPES,
+        lead_minutes or DEFAULT_LEAD_MINUTES,
+        quiet_start,
+        quiet_end,
+    )
+
+
+def get_preferences(telegram_id):
+    """
+    Args:
+        telegram_id (int): Telegram user ID.
+    Returns:
+        dict: The user's preferences with keys reminder_types, lead_minutes, quiet_start, quiet_end.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT reminder_types, lead_minutes, quiet_start, quiet_end FROM user_preferences WHERE telegram_id=?",
+        (telegram_id,)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    types, lead, quiet_start, quiet_end = _profile_from_row(*row) if row else DEFAULT_PROFILE
+    return {"reminder_types": list(types), "lead_minutes": lead, "quiet_start": quiet_start, "quiet_end": quiet_end}
+
+
+def set_preferences(telegram_id, **changes):
+    """
+    Update some of a user's preferences, keeping the others.
+    Args:
+        telegram_id (int): Telegram user ID.
+        **changes: Any of reminder_types (list), lead_minutes (int), quiet_start and quiet_end
+            ('HH:MM' strings, or None to disable quiet hours).
+    Returns:
+        dict: The updated preferences.
+    """
+    prefs = get_preferences(telegram_id)
+    prefs.update(changes)
+    conn = get_db_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO user_preferences (telegram_id, reminder_types, lead_minutes, quiet_start, quiet_end) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (telegram_id, ",".join(prefs["reminder_types"]), prefs["lead_minutes"], prefs["quiet_start"], prefs["quiet_end"])
+    )
+    conn.commit()
+    conn.close()
+    return prefs
+
+
+def get_active_user_profiles():
+    """
+    Group active users by preference profile.
+    Returns:
+        dict: Maps (reminder_types, lead_minutes, quiet_start, quiet_end) to a list of Telegram IDs.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT u.telegram_id, p.reminder_types, p.lead_minutes, p.quiet_start, p.quiet_end
+        FROM users u LEFT JOIN user_preferences p ON p.telegram_id = u.telegram_id
+        WHERE u.is_active=1
+    """)
+    profiles = {}
+    for telegram_id, *prefs in cursor.fetchall():
+        profiles.setdefault(_profile_from_row(*prefs), []).append(telegram_id)
+    cursor.close()
+    conn.close()
+    return profiles
+
+
+def in_quiet_hours(quiet_start, quiet_end, dt):
+    """
+    Check whether a time falls inside a quiet-hours window. Windows may cross midnight
+    (e.g. 22:00-07:00).
+    Args:
+        quiet_start (str): Window start as 'HH:MM', or None.
+        quiet_end (str): Window end as 'HH:MM', or None.
+        dt (datetime): Time to check, in the bot's timezone.
+    Returns:
+        bool: True if dt is inside the window.
+    """
+    if not quiet_start or not quiet_end:
+        return False
+    t = dt.strftime("%H:%M")
+    if quiet_start <= quiet_end:
+        return quiet_start <= t < quiet_end
+    return t >= quiet_start or t < quiet_end
+
+
+def reminder_time(rtype, start_dt, end_dt, lead_minutes):
+    """
+    Args:
+        rtype (str): One of REMINDER_TYPES.
+        start_dt (datetime): Activity start.
+        end_dt (datetime): Activity end.
+        lead_minutes (int): Minutes before start for the "before" reminder.
+    Returns:
+        datetime: When a reminder of this type should be sent.
+    """
+    if rtype == "before":
+        return start_dt - timedelta(minutes=lead_minutes)
+    if rtype == "start":
+        return start_dt
+    if rtype == "mid":
+        return start_dt + (end_dt - start_dt) / 2
+    if rtype == "end":
+        return end_dt
+    if rtype == "30min_after":
+        return end_dt + timedelta(minutes=30)
+    raise ValueError(f"Unknown reminder type: {rtype}")
+
+
+def parse_quiet_hours(value):
+    """
+    Parse a quiet-hours window such as '22:00-07:00'.
+    Args:
+        value (str): Window text.
+    Returns:
+        tuple: (quiet_start, quiet_end) as zero-padded 'HH:MM' strings.
+    Raises:
+        ValueError: If the text is not a valid window.
+    """
+    parts = value.split("-")
+    if len(parts) != 2:
+        raise ValueError(QUIET_HOURS_FORMAT_ERROR)
+    try:
+        start = datetime.strptime(parts[0].strip(), "%H:%M").strftime("%H:%M")
+        end = datetime.strptime(parts[1].strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        raise ValueError(QUIET_HOURS_FORMAT_ERROR) from None
+    if start == end:
+        raise ValueError("Quiet hours start and end must differ.")
+    return start, end
@@ -1,47 +1,46 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from telegram import Bot
-from config import TELEGRAM_BOT_TOKEN, TIMEZONE
-from services.sheet_service import fetch_activities, clean_activities_data
+from config import TIMEZONE
+from services.sheet_service import get_activities
 from services.database import get_db_connection, cleanup_duplicate_telegram_ids
 from services.scheduler_service import schedule_reminder, clear_reminder_jobs
+from services.delivery_log import record_delivery, flush_delivery_log
+from services.preference_service import get_active_user_profiles, reminder_time, in_quiet_hours
+from services.attendance_service import (
+    build_attendance_windows, save_attendance_windows, schedule_attendance_nudges, get_confirmed_users,
+    attendance_keyboard, ATTENDANCE_FOLLOW_UP_TYPES,
+)
 from utils.message_templates import REMINDER_TEMPLATES, MATERIAL_TEMPLATE
+from utils import clock
 import pytz
 
-def get_active_users():
-    """
-    Retrieve a list of active Telegram user IDs from the database.
-    Returns:
-        list: List of active user Telegram IDs.
-    """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT telegram_id FROM users WHERE is_active=1")
-    users = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    return users
-
-import asyncio
-from telegram import Bot
-
-async def schedule_all_reminders(bot: Bot, test_mode=False):
+async def schedule_all_reminders(bot: Bot, from_snapshot=False, activities=None, allow_fallback=True):
     """
     Schedule reminders for all upcoming activities for all active users.
     Args:
         bot (Bot): Telegram Bot instance.
-        test_mode (bool): If True, only schedule a single test reminder for the first valid activity.
+        from_snapshot (bool): If True, use the locally saved sheet snapshot instead of fetching the sheet.
+        activities (list, optional): Cleaned activities to use instead of loading them, e.g. in simulations.
+        allow_fallback (bool): If False, raise when the sheet fetch fails instead of using the snapshot.
     """
+    # Load activities before clearing jobs so a failure leaves the existing reminders in place
+    cleaned = activities if activities is not None else await get_activities(from_snapshot=from_snapshot, allow_fallback=allow_fallback)
+
     # Clear existing reminder jobs before scheduling new ones
     clear_reminder_jobs()
     
     cleanup_duplicate_telegram_ids()
-    raw_values = fetch_activities()
-    cleaned = clean_activities_data(raw_values)
-    users = get_active_users()
-    now = datetime.now(pytz.timezone(TIMEZONE))
-    first_valid_activity_processed = False
-    for idx, row in enumerate(cleaned):
+    profiles = get_active_user_profiles()
+    now = clock.now()
+
+    # Attendance windows for activities that belong to a module, with deadline nudges
+    windows = build_attendance_windows(cleaned, now)
+    window_ids = save_attendance_windows(windows)
+    nudges = schedule_attendance_nudges(bot, windows, now)
+    logging.info(f"Scheduled {nudges} attendance nudges for {len(windows)} attendance windows")
+
+    for row in cleaned:
         title = row.get("Title") or row.get("Lesson Title") or row.get("Unit") or "Activity"
         start_str = row.get("StartTime")
         end_str = row.get("EndTime")
@@ -59,78 +58,41 @@ async def schedule_all_reminders(bot: Bot, test_mode=False):
         if end_dt < now:
             continue
 
-        # TEST MODE: Only schedule ONE test message for the first VALID activity
-        if test_mode and not first_valid_activity_processed:
-            first_valid_activity_processed = True
-            logging.warning(f"[TEST MODE] Scheduling ONE test reminder for the first valid activity (index {idx}): {title}")
-            test_time = now + timedelta(minutes=1)
-            
-            async def test_callback():
-                """
-                Async callback to send a test reminder message to all users for the first valid activity.
-                """
-                logging.warning(f"[TEST MODE] Sending test reminder for: {title}")
-                msg = f"🧪 TEST MODE: {REMINDER_TEMPLATES['start'].format(title=title)}"
-                msg += f"\nTime: {start_str} - {end_str}"
-                location = row.get("Location", "")
-                if location:
-                    msg += f"\nVenue: {location}"
-                    if location.lower() == "online zoom":
-                        msg += "\nZoom Link: https://ntu-sg.zoom.us/meeting/register/xtJa3RhhQuurKMnBXuqEWg"
-                if description:
-                    msg += f"\n{description}"
-                if github_url:
-                    msg += f"\n{MATERIAL_TEMPLATE.format(title=title, github_url=github_url)}"
-                msg += f"\n\n📊 In normal mode, this activity would generate 2 reminders: 30min_before, end"
-                
-                for user_id in users:
-                    try:
-                        await bot.send_message(chat_id=user_id, text=msg)
-                        logging.info(f"[TEST MODE] Test message sent to user {user_id}")
-                    except Exception as e:
-                        logging.warning(f"Failed to send test reminder to {user_id}: {e}")
-
-                module_info = get_module_by_dates(start_str.split()[0])
-                if module_info:
-                    msg = ""
-                    msg += f"\n\nModule: {module_info['module_name']}"
-                    msg += f"\n\nAttendance URL: [{module_info['attendance_url']}]({module_info['attendance_url']})"
-                    msg += f"\nQR Code URL: [{module_info['qr_code_url']}]({module_info['qr_code_url']})"
-
-                    for user_id in users:
-                        try:
-                            await bot.send_message(chat_id=user_id, text=msg, parse_mode="Markdown")
-                        except Exception as e:
-                            logging.warning(f"Failed to send reminder to {user_id}: {e}")
-
-            print(f"[TEST MODE] Scheduling single test reminder for: {title} at {test_time}")
-            schedule_reminder(test_time, test_callback)
-            break
-
         if not start_dt or not end_dt or end_dt < now or (start_dt - now).days > 1:
             continue
 
-        # Schedule reminders
-        reminder_times = {
-            "30min_before": start_dt - timedelta(minutes=30),
-            "end": end_dt,
-        }
-        for rtype, rtime in reminder_times.items():
-            if rtime < now:
-                continue
-            async def callback(title=title, github_url=github_url, rtype=rtype, start_str=start_str, end_str=end_str, location=row.get("Location", "")):
+        window_id = window_ids.get(f"{title} ({start_str})")
+
+        # Schedule one job per (reminder type, send time) bucket, shared by every
+        # preference profile that wants a reminder at that time
+        buckets = build_reminder_buckets(start_dt, end_dt, profiles, now)
+        for (rtype, rtime, minutes), bucket_users in buckets.items():
+            async def callback(title=title, github_url=github_url, rtype=rtype, rtime=rtime, minutes=minutes, bucket_users=bucket_users, start_str=start_str, end_str=end_str, location=row.get("Location", ""), description=description, window_id=window_id):
                 """
-                Async callback to send a scheduled reminder message to all users for a specific activity and reminder type.
+                Async callback to send a scheduled reminder message to the users in one bucket for a specific activity and reminder type.
                 Args:
                     title (str): Activity title.
                     github_url (str): GitHub URL for materials.
-                    rtype (str): Reminder type (e.g., '30min_before', 'end').
+                    rtype (str): Reminder type (e.g., 'before', 'end').
+                    rtime (datetime): Scheduled send time.
+                    minutes (int): Lead time for 'before' reminders.
+                    bucket_users (list): Telegram IDs to send to.
                     start_str (str): Start time string.
                     end_str (str): End time string.
                     location (str): Activity location.
+                    description (str): Activity description.
+                    window_id (int): Attendance window ID, or None if the activity has no module.
                 """
-                logging.warning(f"[DEBUG] Sending reminder: rtype={rtype}, title={title}, time={rtime}, users={users}")
-                msg = REMINDER_TEMPLATES[rtype].format(title=title)
+                recipients = bucket_users
+                if window_id and rtype in ATTENDANCE_FOLLOW_UP_TYPES:
+                    # Users who already confirmed attendance don't need another attendance reminder
+                    confirmed = get_confirmed_users(window_id)
+                    recipients = [u for u in bucket_users if u not in confirmed]
+                logging.info(f"Sending reminder: rtype={rtype}, title={title}, time={rtime}, recipients={len(recipients)}")
+                if not recipients:
+                    return
+                activity = f"{title} ({start_str})"
+                msg = REMINDER_TEMPLATES[rtype].format(title=title, minutes=minutes)
                 msg += f"\nTime: {start_str} - {end_str}"
                 if location:
                     msg += f"\nVenue: {location}"
@@ -139,11 +101,14 @@ async def schedule_all_reminders(bot: Bot, test_mode=False):
                 if github_url:
                     msg += f"\n{MATERIAL_TEMPLATE.format(title=title, github_url=github_url)}"
 
-                for user_id in users:
+                for user_id in recipients:
                     try:
-                        await bot.send_message(chat_id=user_id, text=msg)
+                        sent = await bot.send_message(chat_id=user_id, text=msg)
+                        record_delivery(activity, rtype, user_id, rtime, message_id=sent.message_id)
                     except Exception as e:
-                        logging.warning(f"Failed to send reminder to {user_id}: {e}")
+                        record_delivery(activity, rtype, user_id, rtime, outcome="failed", error=str(e))
+                        logging.warning(f"Failed to send reminder to {user_id}: {e}", extra={"event": "reminder_send_failed", "user_id": user_id})
+                await flush_delivery_log()
 
                 # Add attendance and QR code URLs if module found
                 module_info = get_module_by_dates(start_str.split()[0])
@@ -153,14 +118,38 @@ async def schedule_all_reminders(bot: Bot, test_mode=False):
                     msg += f"\n\nAttendance URL: [{module_info['attendance_url']}]({module_info['attendance_url']})"
                     msg += f"\nQR Code URL: [{module_info['qr_code_url']}]({module_info['qr_code_url']})"
 
-                    for user_id in users:
+                    keyboard = attendance_keyboard(window_id) if window_id else None
+                    for user_id in recipients:
                         try:
-                            await bot.send_message(chat_id=user_id, text=msg, parse_mode="Markdown")
+                            await bot.send_message(chat_id=user_id, text=msg, parse_mode="Markdown", reply_markup=keyboard)
                         except Exception as e:
-                            logging.warning(f"Failed to send reminder to {user_id}: {e}")
+                            logging.warning(f"Failed to send reminder to {user_id}: {e}", extra={"event": "reminder_send_failed", "user_id": user_id})
 
             # Schedule the async callback using the scheduler (must support async jobs)
-            schedule_reminder(rtime, callback)
+            schedule_reminder(rtime, callback, name=f"reminder:{rtype}:{title} ({start_str})")
+
+def build_reminder_buckets(start_dt, end_dt, profiles, now):
+    """
+    Group the reminders wanted by each preference profile for one activity into buckets
+    of identical (reminder type, send time).
+    Args:
+        start_dt (datetime): Activity start.
+        end_dt (datetime): Activity end.
+        profiles (dict): Preference profile -> list of Telegram IDs, from get_active_user_profiles().
+        now (datetime): Current time; reminders due before this are skipped.
+    Returns:
+        dict: (rtype, rtime, minutes) -> list of Telegram IDs. minutes is the lead time for
+        'before' reminders and None otherwise.
+    """
+    buckets = {}
+    for (types, lead_minutes, quiet_start, quiet_end), profile_users in profiles.items():
+        for rtype in types:
+            rtime = reminder_time(rtype, start_dt, end_dt, lead_minutes)
+            if rtime < now or in_quiet_hours(quiet_start, quiet_end, rtime):
+                continue
+            minutes = lead_minutes if rtype == "before" else None
+            buckets.setdefault((rtype, rtime, minutes), []).extend(profile_users)
+    return buckets
             
 def get_module_by_dates(activity_date):
     """
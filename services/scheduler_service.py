@@ -1,21 +1,40 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from pytz import timezone
 import logging
+from utils.profiling import profiled
 
 scheduler = AsyncIOScheduler()
+# Jobs that clear_reminder_jobs() must keep
+PERSISTENT_JOB_IDS = {"daily_reminder_refresh"}
+# When set (by the simulation engine), jobs go to this virtual scheduler instead of APScheduler
+_virtual_scheduler = None
 
-def schedule_reminder(dt, callback, args=None):
+def use_virtual_scheduler(virtual_scheduler):
+    """
+    Route schedule_reminder, schedule_daily_job and clear_reminder_jobs to a virtual
+    scheduler, e.g. services.simulation.VirtualScheduler. Pass None to restore APScheduler.
+    """
+    global _virtual_scheduler
+    _virtual_scheduler = virtual_scheduler
+
+def schedule_reminder(dt, callback, args=None, name=None):
     """
     Schedule a one-time reminder job to run at the specified datetime.
     Args:
         dt (datetime): The date and time to run the job.
         callback (callable): The function or coroutine to call.
         args (list, optional): Arguments to pass to the callback.
+        name (str, optional): Job label for profiling, e.g. 'reminder:end:Lesson 1 (01/07/2025 19:00:00)'.
+            Defaults to the callback's qualified name.
     """
+    if _virtual_scheduler is not None:
+        _virtual_scheduler.add_job(dt, callback, args or [])
+        return
     scheduler.add_job(
-        callback,
+        profiled(f"job:{name or callback.__qualname__}", callback),
         trigger=DateTrigger(run_date=dt),
         args=args or [],
         misfire_grace_time=60,  # Allow job to run if missed by up to 60 seconds
@@ -32,8 +51,11 @@ def schedule_daily_job(hour, minute, callback, args=None, timezone_str="Asia/Sin
         args (list, optional): Arguments to pass to the callback.
         timezone_str (str): Timezone string.
     """
+    if _virtual_scheduler is not None:
+        _virtual_scheduler.add_daily_job(hour, minute, callback, args or [])
+        return
     scheduler.add_job(
-        callback,
+        profiled(f"job:{callback.__qualname__}", callback),
         trigger=CronTrigger(hour=hour, minute=minute, timezone=timezone_str),
         args=args or [],
         misfire_grace_time=300,  # Allow job to run if missed by up to 5 minutes
@@ -41,13 +63,37 @@ def schedule_daily_job(hour, minute, callback, args=None, timezone_str="Asia/Sin
         id="daily_reminder_refresh"  # Unique ID to prevent duplicates
     )
 
+def schedule_interval_job(seconds, callback, job_id, args=None):
+    """
+    Schedule a maintenance job to run every `seconds` seconds. Unlike reminder jobs, it is
+    kept by clear_reminder_jobs().
+    Args:
+        seconds (float): Interval between runs.
+        callback (callable): The function or coroutine to call.
+        job_id (str): Unique job ID.
+        args (list, optional): Arguments to pass to the callback.
+    """
+    PERSISTENT_JOB_IDS.add(job_id)
+    scheduler.add_job(
+        profiled(f"job:{job_id}", callback),
+        trigger=IntervalTrigger(seconds=seconds),
+        args=args or [],
+        coalesce=True,
+        max_instances=1,
+        id=job_id,
+        replace_existing=True
+    )
+
 def clear_reminder_jobs():
     """
-    Clear all scheduled reminder jobs except the daily refresh job.
+    Clear all scheduled reminder jobs, keeping the daily refresh and interval jobs.
     """
+    if _virtual_scheduler is not None:
+        _virtual_scheduler.clear_reminder_jobs()
+        return
     jobs_to_remove = []
     for job in scheduler.get_jobs():
-        if job.id != "daily_reminder_refresh":
+        if job.id not in PERSISTENT_JOB_IDS:
             jobs_to_remove.append(job.id)
     
     for job_id in jobs_to_remove:
@@ -1,7 +1,23 @@
-import gspread
-from google.oauth2.service_account import Credentials
+import asyncio
+import hashlib
+import json
+import logging
 from config import GOOGLE_SHEET_ID, GOOGLE_SERVICE_ACCOUNT_JSON
 from config import GOOGLE_SHEET_NAME
+from services.database import get_db_connection
+
+# Single-flight state: concurrent callers of fetch_activities_shared() await the same fetch
+_inflight_fetch = None
+# Digest of the last fetched sheet values, used to detect sheet changes
+_last_values_digest = None
+_change_listeners = []
+# Authorized gspread client, created on first use
+_client = None
+
+# Bump when the structure of cleaned activity dicts changes; older snapshots are then ignored
+SNAPSHOT_FORMAT_VERSION = 1
+# In-memory copy of the last snapshot: {"fetched_at", "digest", "activities"}
+_snapshot = None
 
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets.readonly',
@@ -11,9 +27,16 @@ SCOPES = [
 def get_gspread_client():
     """
     Returns an authorized gspread client using the service account credentials.
+    The client is created on first use and reused afterwards. gspread and google-auth
+    are imported here rather than at module level to keep bot startup fast.
     """
-    creds = Credentials.from_service_account_file(GOOGLE_SERVICE_ACCOUNT_JSON, scopes=SCOPES)
-    return gspread.authorize(creds)
+    global _client
+    if _client is None:
+        import gspread
+        from google.oauth2.service_account import Credentials
+        creds = Credentials.from_service_account_file(GOOGLE_SERVICE_ACCOUNT_JSON, scopes=SCOPES)
+        _client = gspread.authorize(creds)
+    return _client
 
 def fetch_activities():
     """
@@ -27,9 +50,144 @@ def fetch_activities():
     if GOOGLE_SHEET_NAME is None:
         raise ValueError("GOOGLE_SHEET_NAME must not be None.")
     sheet = client.open_by_key(GOOGLE_SHEET_ID).worksheet(GOOGLE_SHEET_NAME)
-    values = sheet.get_all_values()
+    return sheet.get_all_values()
+
+def on_sheet_change(callback):
+    """
+    Register a callback to be invoked (with no arguments) whenever a fetch returns data
+    that differs from the previous fetch.
+    Args:
+        callback (callable): Function to call on change.
+    """
+    _change_listeners.append(callback)
+
+def _check_for_change(values):
+    """
+    Compare the fetched values against the previous fetch and notify listeners on change.
+    Called on the event loop, so listeners may safely touch loop-owned state.
+    """
+    global _last_values_digest
+    digest = hashlib.sha1(json.dumps(values).encode("utf-8")).hexdigest()
+    if digest == _last_values_digest:
+        return
+    _last_values_digest = digest
+    for callback in _change_listeners:
+        try:
+            callback()
+        except Exception as e:
+            logging.warning(f"Sheet change listener failed: {e}")
+
+async def _fetch_and_check():
+    """
+    Run fetch_activities() in a worker thread, then check for changes back on the event loop.
+    """
+    values = await asyncio.to_thread(fetch_activities)
+    _check_for_change(values)
     return values
 
+async def fetch_activities_shared():
+    """
+    Async, coalesced version of fetch_activities(). The blocking Google API call runs in a
+    worker thread, and concurrent callers share a single in-flight request instead of
+    each starting their own. Change listeners run on the event loop once per fetch.
+    Returns:
+        list: List of rows from the worksheet.
+    """
+    global _inflight_fetch
+    if _inflight_fetch is None:
+        _inflight_fetch = asyncio.ensure_future(_fetch_and_check())
+        _inflight_fetch.add_done_callback(_clear_inflight_fetch)
+    # Shield so that one cancelled caller does not cancel the fetch for everyone else
+    return await asyncio.shield(_inflight_fetch)
+
+def _clear_inflight_fetch(future):
+    global _inflight_fetch
+    if _inflight_fetch is future:
+        _inflight_fetch = None
+
+def save_snapshot(activities):
+    """
+    Persist cleaned activities to the 'sheet_snapshot' table so they can be used when
+    Google is unreachable and on the next startup. Skips the write if nothing changed.
+    Args:
+        activities (list): Cleaned activity dictionaries.
+    """
+    global _snapshot
+    data = json.dumps(activities, separators=(",", ":"))
+    digest = hashlib.sha1(data.encode("utf-8")).hexdigest()
+    if _snapshot and _snapshot["digest"] == digest:
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT OR REPLACE INTO sheet_snapshot (snapshot_id, format_version, fetched_at, digest, activities) "
+        "VALUES (1, ?, datetime('now'), ?, ?)",
+        (SNAPSHOT_FORMAT_VERSION, digest, data)
+    )
+    conn.commit()
+    cursor.execute("SELECT fetched_at FROM sheet_snapshot WHERE snapshot_id=1")
+    fetched_at = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    _snapshot = {"fetched_at": fetched_at, "digest": digest, "activities": activities}
+    logging.info(f"Saved sheet snapshot with {len(activities)} activities")
+
+def load_snapshot():
+    """
+    Load the last saved activities snapshot, reading the database only on first use.
+    Returns:
+        dict or None: {"fetched_at", "digest", "activities"}, or None if there is no
+        usable snapshot.
+    """
+    global _snapshot
+    if _snapshot is not None:
+        return _snapshot
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT format_version, fetched_at, digest, activities FROM sheet_snapshot WHERE snapshot_id=1")
+        row = cursor.fetchone()
+    except Exception as e:
+        logging.warning(f"Failed to read sheet snapshot: {e}")
+        row = None
+    cursor.close()
+    conn.close()
+    if row is None:
+        return None
+    if row[0] != SNAPSHOT_FORMAT_VERSION:
+        logging.warning(f"Ignoring sheet snapshot with format version {row[0]} (expected {SNAPSHOT_FORMAT_VERSION})")
+        return None
+    _snapshot = {"fetched_at": row[1], "digest": row[2], "activities": json.loads(row[3])}
+    return _snapshot
+
+async def get_activities(from_snapshot=False, allow_fallback=True):
+    """
+    Returns the cleaned list of activities. Fetches the sheet (coalesced with other
+    callers) and saves a snapshot on success; if the fetch fails, falls back to the last
+    snapshot so that reminders and /recent keep working during Google outages.
+    Args:
+        from_snapshot (bool): If True, use the snapshot without a network round trip
+            when one exists.
+        allow_fallback (bool): If False, raise when the fetch fails instead of falling back
+            to the snapshot, e.g. for callers that retry the live sheet themselves.
+    Returns:
+        list: List of cleaned activity dictionaries.
+    """
+    if from_snapshot:
+        snapshot = load_snapshot()
+        if snapshot is not None:
+            return snapshot["activities"]
+    try:
+        activities = clean_activities_data(await fetch_activities_shared())
+    except Exception as e:
+        snapshot = load_snapshot() if allow_fallback else None
+        if snapshot is None:
+            raise
+        logging.warning(f"Sheet fetch failed, using snapshot from {snapshot['fetched_at']} UTC: {e}")
+        return snapshot["activities"]
+    save_snapshot(activities)
+    return activities
+
 def clean_activities_data(values):
     """
     Cleans and extracts relevant columns from the raw sheet values.
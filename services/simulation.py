@@ -0,0 +1,123 @@
+"""
+Deterministic time-travel simulation of reminder scheduling and delivery.
+
+The real scheduling code (schedule_all_reminders, the daily 23:00 refresh and the reminder
+callbacks) runs against a virtual clock, a virtual scheduler and a fake bot. Jobs run in
+time order as fast as the CPU allows, and every message that would have been sent is
+recorded with its virtual send time. See simulate.py for the command line entry point.
+"""
+import heapq
+import inspect
+import itertools
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytz
+from config import TIMEZONE
+from services.reminder_logic import schedule_all_reminders
+from services.scheduler_service import use_virtual_scheduler, schedule_daily_job
+from utils import clock
+
+
+class VirtualScheduler:
+    """
+    Minimal stand-in for APScheduler that runs jobs in order of their virtual run time.
+    """
+
+    def __init__(self, start):
+        self.now = start
+        # Heap of (run_at, seq, callback, args, daily) where daily is (hour, minute) or None
+        self._jobs = []
+        self._seq = itertools.count()
+        self.jobs_scheduled = 0
+        self.jobs_run = 0
+
+    def add_job(self, run_at, callback, args, daily=None):
+        heapq.heappush(self._jobs, (run_at, next(self._seq), callback, args, daily))
+        if daily is None:
+            self.jobs_scheduled += 1
+
+    def add_daily_job(self, hour, minute, callback, args):
+        self.add_job(self._next_daily_run(hour, minute, self.now), callback, args, daily=(hour, minute))
+
+    def clear_reminder_jobs(self):
+        self._jobs = [job for job in self._jobs if job[4] is not None]
+        heapq.heapify(self._jobs)
+
+    def _next_daily_run(self, hour, minute, after):
+        tz = pytz.timezone(TIMEZONE)
+        day = after.astimezone(tz).date()
+        run_at = tz.localize(datetime(day.year, day.month, day.day, hour, minute))
+        if run_at <= after:
+            run_at = tz.localize(datetime.combine(day + timedelta(days=1), run_at.time()))
+        return run_at
+
+    async def run_until(self, end):
+        """
+        Run every job due up to `end`, advancing the virtual clock to each job's run time.
+        """
+        while self._jobs and self._jobs[0][0] <= end:
+            run_at, _, callback, args, daily = heapq.heappop(self._jobs)
+            self.now = max(self.now, run_at)
+            if daily is not None:
+                self.add_job(self._next_daily_run(*daily, run_at), callback, args, daily=daily)
+            result = callback(*args)
+            if inspect.isawaitable(result):
+                await result
+            self.jobs_run += 1
+        self.now = max(self.now, end)
+
+
+class FakeBot:
+    """
+    Records messages instead of sending them. Each send advances the virtual clock by
+    `send_latency` seconds, to model how long a real fan-out takes.
+    """
+
+    def __init__(self, scheduler, send_latency=0.0):
+        self.scheduler = scheduler
+        self.send_latency = timedelta(seconds=send_latency)
+        self.sent = []
+        self._message_ids = itertools.count(1)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.scheduler.now += self.send_latency
+        message_id = next(self._message_ids)
+        self.sent.append({"time": self.scheduler.now, "chat_id": chat_id, "text": text})
+        return SimpleNamespace(message_id=message_id, chat_id=chat_id)
+
+
+async def run_simulation(activities, start, days=7, send_latency=0.0):
+    """
+    Replay scheduling and delivery of reminders from `start` for `days` days.
+    Args:
+        activities (list): Cleaned activity dicts, e.g. from a sheet snapshot.
+        start (datetime): Timezone-aware virtual start time.
+        days (float): Length of the simulated period.
+        send_latency (float): Virtual seconds each send takes.
+    Returns:
+        dict: messages (list of {time, chat_id, text}), jobs_scheduled, jobs_run and
+        wall_seconds (real time the replay took).
+    """
+    scheduler = VirtualScheduler(start)
+    bot = FakeBot(scheduler, send_latency=send_latency)
+    clock.set_clock(lambda: scheduler.now)
+    use_virtual_scheduler(scheduler)
+    wall_start = time.perf_counter()
+    try:
+        async def daily_reminder_refresh():
+            await schedule_all_reminders(bot, activities=activities)
+
+        schedule_daily_job(23, 0, daily_reminder_refresh, timezone_str=TIMEZONE)
+        # Same as startup: schedule immediately, then refresh daily at 23:00
+        await schedule_all_reminders(bot, activities=activities)
+        await scheduler.run_until(start + timedelta(days=days))
+    finally:
+        clock.set_clock(None)
+        use_virtual_scheduler(None)
+    return {
+        "messages": bot.sent,
+        "jobs_scheduled": scheduler.jobs_scheduled,
+        "jobs_run": scheduler.jobs_run,
+        "wall_seconds": time.perf_counter() - wall_start,
+    }
@@ -0,0 +1,135 @@
+"""
+HTTP client settings for the Telegram Bot API.
+
+The bot uses two connection pools: a small one for getUpdates long polling and a larger
+one for everything the bot sends, so a reminder or broadcast fan-out never competes with
+polling for connections. Both pools keep idle connections open for TELEGRAM_KEEPALIVE_EXPIRY
+seconds (so fan-outs minutes apart reuse the same TLS connections), use HTTP/2 when available
+and have their own timeouts. Every request is counted per pool, together with the number of
+new TCP connections it needed, so connection reuse can be checked with /http_stats.
+"""
+import logging
+import time
+import httpx
+from telegram.request import HTTPXRequest
+from config import (
+    TELEGRAM_SEND_POOL_SIZE, TELEGRAM_UPDATES_POOL_SIZE, TELEGRAM_KEEPALIVE_EXPIRY, TELEGRAM_HTTP2,
+    TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_SEND_READ_TIMEOUT, TELEGRAM_SEND_WRITE_TIMEOUT,
+    TELEGRAM_MEDIA_WRITE_TIMEOUT, TELEGRAM_POOL_TIMEOUT, TELEGRAM_UPDATES_READ_TIMEOUT,
+)
+
+# Per-pool counters: requests, failed, new_connections and total_seconds
+metrics = {}
+
+
+def _new_metrics(http_version):
+    return {"http_version": http_version, "requests": 0, "failed": 0, "new_connections": 0, "total_seconds": 0.0}
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    HTTPXRequest that records request counts, latency and new connections for one pool.
+    New connections are counted with httpcore's request trace extension.
+    """
+
+    def __init__(self, pool, **kwargs):
+        self.pool = pool
+        metrics[pool] = _new_metrics(kwargs.get("http_version", "1.1"))
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                metrics[pool]["new_connections"] += 1
+
+        async def add_trace(request):
+            request.extensions["trace"] = trace
+
+        httpx_kwargs = dict(kwargs.pop("httpx_kwargs", None) or {})
+        httpx_kwargs["event_hooks"] = {"request": [add_trace]}
+        super().__init__(httpx_kwargs=httpx_kwargs, **kwargs)
+
+    async def do_request(self, *args, **kwargs):
+        pool_metrics = metrics[self.pool]
+        pool_metrics["requests"] += 1
+        start = time.perf_counter()
+        try:
+            return await super().do_request(*args, **kwargs)
+        except Exception:
+            pool_metrics["failed"] += 1
+            raise
+        finally:
+            pool_metrics["total_seconds"] += time.perf_counter() - start
+
+
+def build_request(pool, pool_size=None, http2=TELEGRAM_HTTP2, keepalive_expiry=TELEGRAM_KEEPALIVE_EXPIRY):
+    """
+    Build the request object for one connection pool.
+    Args:
+        pool (str): 'send' for outgoing API calls or 'updates' for getUpdates.
+        pool_size (int, optional): Maximum open connections. Defaults to the pool's configured size.
+        http2 (bool): Use HTTP/2. Falls back to HTTP/1.1 if the h2 package is not installed.
+        keepalive_expiry (float): Seconds an idle connection is kept open for reuse.
+    Returns:
+        InstrumentedRequest: Request object for ApplicationBuilder.request() or get_updates_request().
+    """
+    if pool == "updates":
+        pool_size = pool_size or TELEGRAM_UPDATES_POOL_SIZE
+        timeouts = {"read_timeout": TELEGRAM_UPDATES_READ_TIMEOUT, "write_timeout": TELEGRAM_SEND_WRITE_TIMEOUT}
+    else:
+        pool_size = pool_size or TELEGRAM_SEND_POOL_SIZE
+        timeouts = {
+            "read_timeout": TELEGRAM_SEND_READ_TIMEOUT,
+            "write_timeout": TELEGRAM_SEND_WRITE_TIMEOUT,
+            "media_write_timeout": TELEGRAM_MEDIA_WRITE_TIMEOUT,
+        }
+    limits = httpx.Limits(
+        max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=keepalive_expiry
+    )
+    kwargs = dict(
+        connection_pool_size=pool_size,
+        connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+        pool_timeout=TELEGRAM_POOL_TIMEOUT,
+        httpx_kwargs={"limits": limits},
+        **timeouts,
+    )
+    if http2:
+        try:
+            return InstrumentedRequest(pool, http_version="2", **kwargs)
+        except RuntimeError as e:
+            logging.warning(f"HTTP/2 is not available for the Telegram '{pool}' pool, using HTTP/1.1: {e}")
+    return InstrumentedRequest(pool, http_version="1.1", **kwargs)
+
+
+def get_connection_metrics():
+    """
+    Returns:
+        dict: Per pool: http_version, requests, failed, new_connections, reused (requests that
+        did not open a connection), reuse_ratio and avg_latency in seconds.
+    """
+    snapshot = {}
+    for pool, pool_metrics in metrics.items():
+        row = dict(pool_metrics)
+        requests = row["requests"]
+        row["reused"] = max(0, requests - row["new_connections"])
+        row["reuse_ratio"] = row["reused"] / requests if requests else None
+        row["avg_latency"] = row.pop("total_seconds") / requests if requests else None
+        snapshot[pool] = row
+    return snapshot
+
+
+def format_connection_metrics(snapshot):
+    """
+    Render get_connection_metrics() output as plain text.
+    """
+    if not snapshot:
+        return "No Telegram requests recorded."
+    lines = []
+    for pool, row in snapshot.items():
+        lines.append(f"{pool} (HTTP/{row['http_version']})")
+        if row["requests"]:
+            lines.append(
+                f"  requests {row['requests']}, failed {row['failed']}, new connections {row['new_connections']}, "
+                f"reused {row['reuse_ratio']:.1%}, avg latency {row['avg_latency'] * 1000:.1f}ms"
+            )
+        else:
+            lines.append("  no requests yet")
+    return "\n".join(lines)
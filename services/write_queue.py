@@ -0,0 +1,116 @@
+"""
+Write-behind queue for small, frequent SQLite writes such as user registration.
+
+Instead of opening a connection and committing (one fsync) per write, callers submit a
+write function with run_write(). Writes arriving within BATCH_INTERVAL seconds of each
+other are executed by a single background writer in one transaction on a long-lived
+connection. Each write runs inside its own savepoint, so one failing write does not undo
+the others, and every caller still gets its own result or exception once the batch has
+been committed.
+"""
+import asyncio
+import logging
+import sqlite3
+from config import SQLITE_DB_PATH
+
+BATCH_INTERVAL = 0.005  # Seconds to wait for more writes before committing a batch
+MAX_BATCH_SIZE = 500
+
+_queue = None
+_writer_task = None
+_writer_loop = None
+_conn = None
+
+
+def _get_connection():
+    """
+    Returns the writer's long-lived connection, in autocommit mode so that transactions
+    are controlled explicitly.
+    """
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(SQLITE_DB_PATH, isolation_level=None, check_same_thread=False)
+    return _conn
+
+
+def _execute_batch(batch):
+    """
+    Execute a batch of writes in one transaction. Runs in a worker thread.
+    Args:
+        batch (list): (func, args, future) tuples.
+    Returns:
+        list: (ok, value_or_exception) per write, in batch order.
+    """
+    conn = _get_connection()
+    cursor = conn.cursor()
+    results = []
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for func, args, _ in batch:
+            cursor.execute("SAVEPOINT write_op")
+            try:
+                value = func(cursor, *args)
+                cursor.execute("RELEASE SAVEPOINT write_op")
+                results.append((True, value))
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT write_op")
+                cursor.execute("RELEASE SAVEPOINT write_op")
+                results.append((False, e))
+        cursor.execute("COMMIT")
+    except Exception as e:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        results = [(False, e)] * len(batch)
+    finally:
+        cursor.close()
+    return results
+
+
+async def _writer():
+    """
+    Background task that drains the queue, committing one batch at a time.
+    """
+    while True:
+        batch = [await _queue.get()]
+        # Give concurrent callers a moment to join this batch
+        await asyncio.sleep(BATCH_INTERVAL)
+        while not _queue.empty() and len(batch) < MAX_BATCH_SIZE:
+            batch.append(_queue.get_nowait())
+        try:
+            results = await asyncio.to_thread(_execute_batch, batch)
+        except Exception as e:
+            logging.error(f"Write batch of {len(batch)} failed: {e}")
+            results = [(False, e)] * len(batch)
+        for (_, _, future), (ok, value) in zip(batch, results):
+            if future.done():  # Caller was cancelled
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+async def run_write(func, *args):
+    """
+    Queue a write and wait until it has been committed.
+    Args:
+        func (callable): Called as func(cursor, *args) inside the batch transaction.
+            It must only use the given cursor and must not commit.
+        *args: Extra arguments for func.
+    Returns:
+        The value returned by func.
+    Raises:
+        Exception: Whatever func raised, or the error that prevented the commit.
+    """
+    global _queue, _writer_task, _writer_loop
+    loop = asyncio.get_running_loop()
+    if _writer_loop is not loop:
+        # First use, or a new event loop (e.g. in scripts calling asyncio.run() repeatedly)
+        _queue = asyncio.Queue()
+        _writer_loop = loop
+        _writer_task = None
+    if _writer_task is None or _writer_task.done():
+        _writer_task = loop.create_task(_writer())
+    future = loop.create_future()
+    _queue.put_nowait((func, args, future))
+    return await future
@@ -0,0 +1,114 @@
+# simulate.py
+"""
+Replays a week of reminder scheduling and delivery against a virtual clock and a fake bot,
+and reports every message that would be sent. Replaces the old `main.py --test` mode.
+
+The simulation runs on a temporary copy of the bot database, so real users, preferences
+and modules are used but nothing in the real database (e.g. the delivery log) is changed.
+
+Usage:
+    python simulate.py [--start "2025-07-01 08:00"] [--days 7] [--snapshot activities.json]
+                       [--users N] [--send-latency 0.05] [--output messages.jsonl] [--quiet]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+from dotenv import load_dotenv
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate reminder scheduling and delivery")
+    parser.add_argument("--start", help="Virtual start time 'YYYY-MM-DD HH:MM' in the bot timezone (default: now)")
+    parser.add_argument("--days", type=float, default=7, help="Number of days to simulate (default: 7)")
+    parser.add_argument("--snapshot", help="JSON file of cleaned activities (default: the saved sheet snapshot)")
+    parser.add_argument("--users", type=int, help="Simulate N synthetic active users instead of the real ones")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="Virtual seconds each send takes (default: 0)")
+    parser.add_argument("--output", help="Write every simulated message to this JSON lines file")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    return parser.parse_args()
+
+
+def prepare_database():
+    """
+    Point the bot at a temporary database: a copy of the real one, or a fresh one with
+    synthetic users if --users is given. Must run before any project module is imported.
+    """
+    load_dotenv()
+    source = os.getenv("SQLITE_DB_PATH", "bot_database.sqlite3")
+    target = os.path.join(tempfile.mkdtemp(prefix="reminder_simulation_"), "simulation.sqlite3")
+    if os.path.exists(source):
+        # Use the SQLite backup API so a database in use by the bot is copied consistently
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target)
+        src.backup(dst)
+        src.close()
+        dst.close()
+    os.environ["SQLITE_DB_PATH"] = target
+    return target
+
+
+def main():
+    args = parse_args()
+    db_path = prepare_database()
+
+    import pytz
+    from config import TIMEZONE
+    from populate_modules import populate_modules
+    from services.database import ensure_tables, get_db_connection
+    from services.sheet_service import load_snapshot
+    from services.simulation import run_simulation
+    from services.delivery_log import get_lateness_report, format_lateness_report
+
+    ensure_tables()
+    populate_modules()
+    if args.users:
+        conn = get_db_connection()
+        conn.execute("DELETE FROM users")
+        conn.executemany(
+            "INSERT INTO users (telegram_id, username, registration_date, is_active) VALUES (?, ?, datetime('now'), 1)",
+            [(1000000 + i, f"sim_user_{i}") for i in range(args.users)]
+        )
+        conn.commit()
+        conn.close()
+
+    if args.snapshot:
+        with open(args.snapshot, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        activities = data["activities"] if isinstance(data, dict) else data
+    else:
+        snapshot = load_snapshot()
+        if snapshot is None:
+            raise SystemExit("No saved sheet snapshot found; run the bot once or pass --snapshot.")
+        activities = snapshot["activities"]
+
+    tz = pytz.timezone(TIMEZONE)
+    start = tz.localize(datetime.strptime(args.start, "%Y-%m-%d %H:%M")) if args.start else datetime.now(tz)
+    result = asyncio.run(run_simulation(activities, start, days=args.days, send_latency=args.send_latency))
+    messages = result["messages"]
+
+    if not args.quiet:
+        for message in messages:
+            first_line = message["text"].strip().splitlines()[0] if message["text"].strip() else ""
+            print(f"{message['time']:%Y-%m-%d %H:%M:%S} -> {message['chat_id']}: {first_line}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps({**message, "time": message["time"].isoformat()}, ensure_ascii=False) + "\n")
+
+    wall = result["wall_seconds"] or 1e-9
+    print()
+    print(f"Simulated {args.days:g} days from {start:%Y-%m-%d %H:%M %Z} ({len(activities)} activities)")
+    print(f"Jobs scheduled: {result['jobs_scheduled']}, jobs run: {result['jobs_run']}")
+    print(f"Messages: {len(messages)}")
+    print(f"Wall time: {result['wall_seconds']:.3f}s ({result['jobs_run'] / wall:.0f} jobs/s, {len(messages) / wall:.0f} messages/s)")
+    print()
+    print(format_lateness_report(get_lateness_report()))
+    print(f"\nSimulation database: {db_path}")
+
+
+if __name__ == "__main__":
+    main()
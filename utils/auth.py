@@ -0,0 +1,15 @@
+"""
+Authorization helpers for admin-only bot commands.
+"""
+from config import ADMIN_TELEGRAM_IDS
+
+
+def is_admin(update):
+    """
+    Check whether the user who sent an update is listed in ADMIN_TELEGRAM_IDS.
+    Args:
+        update (Update): Incoming Telegram update.
+    Returns:
+        bool: True if the sender is an admin.
+    """
+    return bool(update.effective_user) and update.effective_user.id in ADMIN_TELEGRAM_IDS
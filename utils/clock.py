@@ -0,0 +1,39 @@
+"""
+Source of the current time for reminder scheduling and delivery logging.
+
+Uses the real clock by default. The simulation engine (services/simulation.py) replaces
+it with a virtual clock so that a week of scheduling can be replayed instantly.
+"""
+from datetime import datetime
+import pytz
+from config import TIMEZONE
+
+_now_func = None
+
+
+def now():
+    """
+    Returns:
+        datetime: The current time in the bot's timezone.
+    """
+    if _now_func is not None:
+        return _now_func()
+    return datetime.now(pytz.timezone(TIMEZONE))
+
+
+def timestamp():
+    """
+    Returns:
+        float: The current time as a Unix timestamp.
+    """
+    return now().timestamp()
+
+
+def set_clock(now_func):
+    """
+    Replace the clock.
+    Args:
+        now_func (callable or None): Returns a timezone-aware datetime; None restores the real clock.
+    """
+    global _now_func
+    _now_func = now_func
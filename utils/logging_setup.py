@@ -0,0 +1,127 @@
+"""
+Non-blocking, structured logging.
+
+Log calls only put records on an in-memory queue (QueueHandler); a background thread
+(QueueListener) formats them and writes JSON lines to a rotating file plus plain text to
+the console. Disk I/O therefore never happens on the event loop.
+
+High-volume per-user events are sampled: pass extra={"event": "<name>"} for an event
+listed in SAMPLED_EVENTS. The first LOG_SAMPLE_BURST records of that event per window
+are kept, then only one in LOG_SAMPLE_EVERY; the next kept record carries the number
+of records dropped in between in its "suppressed" field.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from config import LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+SAMPLED_EVENTS = {"reminder_send_failed"}
+LOG_SAMPLE_BURST = 20
+LOG_SAMPLE_EVERY = 50
+LOG_SAMPLE_WINDOW = 60  # Seconds
+
+# Attributes every LogRecord has; anything else was passed via `extra` and is added to the JSON output
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drops most records of high-volume events, see the module docstring.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        # event -> [window_start, seen_in_window, suppressed_since_last_kept]
+        self._state = {}
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event not in SAMPLED_EVENTS:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(event)
+            if state is None or now - state[0] > LOG_SAMPLE_WINDOW:
+                state = self._state[event] = [now, 0, state[2] if state else 0]
+            state[1] += 1
+            if state[1] > LOG_SAMPLE_BURST and state[1] % LOG_SAMPLE_EVERY:
+                state[2] += 1
+                return False
+            if state[2]:
+                record.suppressed = state[2]
+                state[2] = 0
+        return True
+
+
+def _file_handler():
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+def setup_logging():
+    """
+    Route all logging through a queue to a background listener thread. Safe to call
+    more than once; only the first call has an effect.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    file_handler = _file_handler()
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
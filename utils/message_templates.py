@@ -3,7 +3,7 @@ Templates for reminder and material messages used by the Telegram bot.
 """
 
 REMINDER_TEMPLATES = {
-    "30min_before": "Reminder: Activity ({title}) starts in 30 minutes. Remember to scan attendance QR code.",
+    "before": "Reminder: Activity ({title}) starts in {minutes} minutes. Remember to scan attendance QR code.",
     "start": "Activity ({title}) is starting now. Don't forget to scan attendance QR code if required.",
     "mid": "Mid-activity reminder: {title} is in progress.",
     "end": "Activity ({title}) has ended. You have 30 minutes to scan for attendance if you haven't done so.",
@@ -11,3 +11,10 @@ REMINDER_TEMPLATES = {
 }
 
 MATERIAL_TEMPLATE = "Materials for {title}: {github_url}"
+
+ATTENDANCE_NUDGE_TEMPLATE = (
+    "⏰ Attendance for {title} closes in {minutes} minutes ({close_time}). "
+    "If you haven't scanned the QR code yet, do it now."
+)
+ATTENDANCE_BUTTON_TEXT = "✅ I've taken attendance"
+ATTENDANCE_CONFIRMED_TEXT = "Attendance confirmed. You won't get more attendance reminders for this activity."
@@ -0,0 +1,176 @@
+"""
+Opt-in profiling for scheduler jobs and bot handlers.
+
+When enabled (PROFILING_ENABLED, or /profiling on), every wrapped call is timed and a
+sample of calls (PROFILE_SAMPLE_RATE) runs under cProfile. Calls slower than
+PROFILE_SLOW_THRESHOLD are kept, up to the PROFILE_TOP_N slowest, and can be written to
+PROFILE_DIR with dump_slow_traces() for offline analysis (e.g. with snakeviz or pstats).
+
+cProfile profiles the whole thread, so while a sampled coroutine is suspended at an
+await, other coroutines running on the event loop also appear in its profile. Only one
+call is profiled at a time.
+"""
+import cProfile
+import functools
+import heapq
+import inspect
+import io
+import itertools
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+from config import PROFILING_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_SLOW_THRESHOLD, PROFILE_TOP_N, PROFILE_DIR
+
+_state = {"enabled": PROFILING_ENABLED, "profiling": False}
+# Min-heap of (duration, seq, trace) holding the PROFILE_TOP_N slowest calls
+_slow_calls = []
+_seq = itertools.count()
+stats = {"calls": 0, "profiled": 0, "slow": 0}
+
+
+def set_profiling(enabled):
+    """
+    Turn profiling on or off at runtime.
+    Args:
+        enabled (bool): New state.
+    """
+    _state["enabled"] = enabled
+    logging.warning(f"Profiling {'enabled' if enabled else 'disabled'}")
+
+
+def is_profiling_enabled():
+    return _state["enabled"]
+
+
+def _record(name, duration, profile):
+    stats["slow"] += 1
+    trace = {
+        "name": name,
+        "duration": duration,
+        "started_at": datetime.now().strftime("%Y%m%d-%H%M%S"),
+        "stats": pstats.Stats(profile) if profile else None,
+    }
+    entry = (duration, next(_seq), trace)
+    if len(_slow_calls) < PROFILE_TOP_N:
+        heapq.heappush(_slow_calls, entry)
+    else:
+        heapq.heappushpop(_slow_calls, entry)
+    logging.warning(f"Slow call: {name} took {duration:.3f}s", extra={"event": "slow_call", "duration": duration})
+
+
+def _start_profile():
+    """
+    Start a cProfile session for this call if it is sampled and none is running.
+    """
+    if _state["profiling"] or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    _state["profiling"] = True
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+def _finish(name, start, profile):
+    duration = time.perf_counter() - start
+    if profile is not None:
+        profile.disable()
+        _state["profiling"] = False
+        stats["profiled"] += 1
+    if duration >= PROFILE_SLOW_THRESHOLD:
+        _record(name, duration, profile)
+
+
+def profiled(name, func):
+    """
+    Wrap a job or handler callback so that it is timed and sampled when profiling is on.
+    When profiling is off the only overhead is one flag check.
+    Args:
+        name (str): Label used in slow-call reports, e.g. 'handler:recent'.
+        func (callable): Function or coroutine function to wrap.
+    Returns:
+        callable: Wrapped callable of the same kind.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return await func(*args, **kwargs)
+            stats["calls"] += 1
+            profile = _start_profile()
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _finish(name, start, profile)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state["enabled"]:
+            return func(*args, **kwargs)
+        stats["calls"] += 1
+        profile = _start_profile()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _finish(name, start, profile)
+    return wrapper
+
+
+def apply_profiling(handlers):
+    """
+    Wrap the callback of every handler in place with profiled().
+    Args:
+        handlers (list): Handlers as returned by get_handlers().
+    Returns:
+        list: The same handlers, for convenience.
+    """
+    for handler in handlers:
+        commands = getattr(handler, "commands", None)
+        label = "/".join(sorted(commands)) if commands else handler.callback.__name__
+        handler.callback = profiled(f"handler:{label}", handler.callback)
+    return handlers
+
+
+def get_slow_calls():
+    """
+    Returns:
+        list: Kept slow-call traces, slowest first.
+    """
+    return [trace for _, _, trace in sorted(_slow_calls, reverse=True)]
+
+
+def dump_slow_traces(directory=None):
+    """
+    Write the kept slow-call traces to files: a .prof (pstats) file for each profiled call
+    and one summary.txt listing all slow calls with their top functions.
+    Args:
+        directory (str, optional): Output directory. Defaults to PROFILE_DIR.
+    Returns:
+        list: Paths of the files written.
+    """
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    summary = io.StringIO()
+    for rank, trace in enumerate(get_slow_calls(), 1):
+        summary.write(f"#{rank} {trace['name']} {trace['duration']:.3f}s at {trace['started_at']}\n")
+        if trace["stats"] is None:
+            summary.write("  (not sampled for profiling)\n\n")
+            continue
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", trace["name"])
+        path = os.path.join(directory, f"{trace['started_at']}_{rank:02d}_{safe_name}.prof")
+        trace["stats"].dump_stats(path)
+        paths.append(path)
+        trace["stats"].stream = summary
+        trace["stats"].sort_stats("cumulative").print_stats(15)
+    summary_path = os.path.join(directory, "summary.txt")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(summary.getvalue() or "No slow calls recorded.\n")
+    paths.append(summary_path)
+    return paths